@@ -1,46 +1,75 @@
 import os
-from flask import Flask, request, redirect
+import time
+from flask import Flask, g, request, redirect, session
 from flask_cors import CORS
 from flask_migrate import Migrate
 from flask_wtf.csrf import generate_csrf
 from flask_login import LoginManager
 
-from .models import db, User
+from .models import db
 from .api.user_routes import user_routes
 from .api.auth_routes import auth_routes
 from .api.product_routes import product_routes
 from .api.wishlist_routes import wishlist_routes
+from .api.reviews_routes import review_routes
+from .api.cart_routes import cart_routes
 from .seeds import seed_commands
+from .bench import bench_commands
 from .config import Config
+from .cache import cache
+from .metrics import metrics
+from .pool import pool_monitor
+from .replicas import replica_router
+from .identity import identity_cache
+from .hashing import hashing_pool, HashingBusy
+from .static_files import assets_commands, index_page, serve_static
 
 app = Flask(__name__, static_folder='../react-vite/dist', static_url_path='/')
 app.config.from_object(Config)
 
+# Vite build: immutable fingerprinted assets, precompressed when possible
+app.view_functions['static'] = serve_static
+
 # Login Manager
 login = LoginManager(app)
 login.login_view = 'auth.unauthorized'
 
 @login.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    return identity_cache.load_user(int(id))
 
-# Register seed CLI command
+# Register seed, benchmark and asset CLI commands
 app.cli.add_command(seed_commands)
+app.cli.add_command(bench_commands)
+app.cli.add_command(assets_commands)
 
-# Initialize extensions
+# Initialize extensions (the pool monitor and replica router set engine
+# options and binds, so they go first)
+pool_monitor.init_app(app)
+replica_router.init_app(app)
 db.init_app(app)
 Migrate(app, db)
+cache.init_app(app)
+metrics.init_app(app)
+identity_cache.init_app(app)
+hashing_pool.init_app(app)
+metrics.add_collector(cache.metric_lines)
+metrics.add_collector(identity_cache.metric_lines)
+metrics.add_collector(hashing_pool.metric_lines)
+metrics.add_collector(pool_monitor.metric_lines)
+metrics.add_collector(replica_router.metric_lines)
 
 # Enable CORS for frontend (localhost:5173 in dev)
-CORS(app, supports_credentials=True, origins=["http://localhost:5173"])
+CORS_ORIGINS = ["http://localhost:5173"]
+CORS(app, supports_credentials=True, origins=CORS_ORIGINS)
 
 # Register active blueprints
 app.register_blueprint(user_routes, url_prefix='/api/users')
 app.register_blueprint(auth_routes, url_prefix='/api/auth')
 app.register_blueprint(product_routes, url_prefix='/api/products')
 app.register_blueprint(wishlist_routes, url_prefix='/api/wishlist')
-
-# ✅ Optional routes (like reviews) exist in codebase but are not registered here
+app.register_blueprint(review_routes, url_prefix='/api')
+app.register_blueprint(cart_routes, url_prefix='/api/cart')
 
 # HTTPS redirect (only in production, skip OPTIONS preflight)
 @app.before_request
@@ -52,16 +81,52 @@ def https_redirect():
             url = request.url.replace('http://', 'https://', 1)
             return redirect(url, code=301)
 
-# Inject CSRF token after each response
+def csrf_cookie_is_fresh(session=session, cookies=None):
+    """
+    True when this browser already holds the CSRF cookie we last issued to
+    its session and that token isn't close to WTF_CSRF_TIME_LIMIT. Outside
+    a request (app/asgi.py) pass the decoded session and cookies.
+    """
+    if cookies is None:
+        cookies = request.cookies
+    issued_at = session.get('csrf_issued_at')
+    if issued_at is None or cookies.get('csrf_token') != session.get('csrf_cookie'):
+        return False
+    time_limit = app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    if time_limit is None:
+        return True
+    return time.time() - issued_at < time_limit - app.config['CSRF_REFRESH_MARGIN']
+
+
+def is_cacheable(response):
+    return (
+        response.status_code == 304
+        or (request.method == 'GET' and (response.cache_control.public or response.cache_control.immutable))
+    )
+
+
+# Inject CSRF token after a response, but only when the browser needs a new
+# one; signing a token and rewriting the session on every response is wasted
+# work and a Set-Cookie keeps static responses out of HTTP caches
 @app.after_request
 def inject_csrf_token(response):
+    # a token already minted this request (forms, /api/csrf/restore) is free
+    minted = 'csrf_token' in g
+    if not minted and (is_cacheable(response) or csrf_cookie_is_fresh()):
+        metrics.increment('csrf_token_skipped')
+        return response
+
+    token = generate_csrf()
+    session['csrf_cookie'] = token
+    session['csrf_issued_at'] = int(time.time())
     response.set_cookie(
         'csrf_token',
-        generate_csrf(),
+        token,
         secure=(os.environ.get('FLASK_ENV') == 'production'),
         samesite='Strict' if os.environ.get('FLASK_ENV') == 'production' else None,
         httponly=True
     )
+    metrics.increment('csrf_token_issued')
     return response
 
 # API docs helper
@@ -80,18 +145,51 @@ def api_help():
     }
     return route_list
 
+# Response cache counters
+@app.route("/api/cache/stats")
+@metrics.protected
+def cache_stats():
+    """
+    Returns hit, miss and eviction counters for the response and identity caches,
+    and the database connection pool and replica state
+    """
+    return {
+        'responses': cache.stats(),
+        'identity': identity_cache.stats(),
+        'pool': pool_monitor.stats(),
+        'replicas': replica_router.stats(),
+    }
+
+# Prometheus scrape target
+@app.route("/api/metrics")
+@metrics.protected
+def metrics_view():
+    """
+    Returns request latency, SQL and cache metrics for this worker
+    """
+    return metrics.view()
+
 # React frontend fallback (Vite build)
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def react_root(path):
     if path == 'favicon.ico':
-        return app.send_from_directory('public', 'favicon.ico')
-    return app.send_static_file('index.html')
+        return serve_static(path)
+    return index_page.response()
+
+# Signup/login bursts past the hashing limit are told to back off
+@app.errorhandler(HashingBusy)
+def hashing_busy(e):
+    return (
+        {'errors': {'message': 'Too many sign-ins in progress, please retry shortly.'}},
+        429,
+        {'Retry-After': str(e.retry_after)}
+    )
 
 # Handle 404s with React frontend
 @app.errorhandler(404)
 def not_found(e):
-    return app.send_static_file('index.html')
+    return index_page.response()
 
 # CSRF restore route (for dev)
 @app.route("/api/csrf/restore", methods=["GET"])
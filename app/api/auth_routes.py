@@ -28,7 +28,12 @@ def login():
     form['csrf_token'].data = request.cookies['csrf_token']
     if form.validate_on_submit():
         # Add the user to the session, we are logged in!
-        user = User.query.filter(User.email == form.data['email']).first()
+        user = form.user
+        if user.needs_rehash():
+            # Hash settings changed since this password was stored; upgrade
+            # it now that we have the plaintext
+            user.password = form.data['password']
+            db.session.commit()
         login_user(user)
         return user.to_dict()
     return form.errors, 401
@@ -0,0 +1,165 @@
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
+from sqlalchemy import case, func
+from app.models import db, ShoppingCart, Product, dialect_insert
+
+cart_routes = Blueprint("cart", __name__)
+
+MAX_QUANTITY = 99
+
+
+def cart_summary(user_id):
+    """
+    Cart lines, line totals and the cart total from one joined SELECT.
+    """
+    line_total = Product.price * ShoppingCart.quantity
+    rows = db.session.query(
+        ShoppingCart.product_id,
+        ShoppingCart.quantity,
+        Product.title,
+        Product.price,
+        Product.cover_image_url,
+        line_total.label("line_total"),
+        func.sum(line_total).over().label("cart_total"),
+        func.sum(ShoppingCart.quantity).over().label("item_count"),
+    ).join(Product, Product.id == ShoppingCart.product_id) \
+        .filter(ShoppingCart.user_id == user_id) \
+        .order_by(ShoppingCart.created_at, ShoppingCart.id) \
+        .all()
+
+    return {
+        "items": [
+            {
+                "productId": row.product_id,
+                "title": row.title,
+                "coverImageUrl": row.cover_image_url,
+                "price": float(row.price),
+                "quantity": row.quantity,
+                "lineTotal": round(float(row.line_total), 2),
+            } for row in rows
+        ],
+        "itemCount": int(rows[0].item_count) if rows else 0,
+        "total": round(float(rows[0].cart_total), 2) if rows else 0.0,
+    }
+
+
+def parse_quantity(value, allow_zero=False):
+    if isinstance(value, bool) or not isinstance(value, int):
+        return None
+    if value < (0 if allow_zero else 1) or value > MAX_QUANTITY:
+        return None
+    return value
+
+
+def upsert_cart_lines(user_id, quantities):
+    """
+    Adds {product_id: quantity} to the user's cart in one INSERT ... ON
+    CONFLICT statement, so concurrent adds bump the existing row instead of
+    creating duplicates.
+    """
+    stmt = dialect_insert(ShoppingCart).values([
+        {"user_id": user_id, "product_id": product_id, "quantity": quantity}
+        for product_id, quantity in quantities.items()
+    ])
+    merged = ShoppingCart.quantity + stmt.excluded.quantity
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "product_id"],
+        set_={"quantity": case((merged > MAX_QUANTITY, MAX_QUANTITY), else_=merged)}
+    )
+    db.session.execute(stmt)
+
+
+# GET /api/cart — Cart lines and totals
+@cart_routes.route("/", methods=["GET"])
+@login_required
+def get_cart():
+    return jsonify(cart_summary(current_user.id))
+
+
+# POST /api/cart/<int:product_id> — Add a quantity (default 1) of a product
+@cart_routes.route("/<int:product_id>", methods=["POST"])
+@login_required
+def add_to_cart(product_id):
+    data = request.get_json(silent=True) or {}
+    quantity = parse_quantity(data.get("quantity", 1))
+    if quantity is None:
+        return jsonify({"errors": {"quantity": f"Quantity must be between 1 and {MAX_QUANTITY}."}}), 400
+    if not db.session.query(Product.id).filter(Product.id == product_id).first():
+        return jsonify({"error": "Product not found"}), 404
+
+    upsert_cart_lines(current_user.id, {product_id: quantity})
+    db.session.commit()
+    return jsonify(cart_summary(current_user.id)), 200
+
+
+# PUT /api/cart/<int:product_id> — Set a product's quantity (0 removes it)
+@cart_routes.route("/<int:product_id>", methods=["PUT"])
+@login_required
+def update_cart_quantity(product_id):
+    data = request.get_json(silent=True) or {}
+    quantity = parse_quantity(data.get("quantity"), allow_zero=True)
+    if quantity is None:
+        return jsonify({"errors": {"quantity": f"Quantity must be between 0 and {MAX_QUANTITY}."}}), 400
+
+    lines = ShoppingCart.query.filter_by(user_id=current_user.id, product_id=product_id)
+    if quantity == 0:
+        changed = lines.delete(synchronize_session=False)
+    else:
+        changed = lines.update({"quantity": quantity}, synchronize_session=False)
+    if not changed:
+        db.session.rollback()
+        return jsonify({"error": "Product not found in cart"}), 404
+
+    db.session.commit()
+    return jsonify(cart_summary(current_user.id)), 200
+
+
+# DELETE /api/cart/<int:product_id> — Remove a product from the cart
+@cart_routes.route("/<int:product_id>", methods=["DELETE"])
+@login_required
+def remove_from_cart(product_id):
+    removed = ShoppingCart.query.filter_by(user_id=current_user.id, product_id=product_id) \
+        .delete(synchronize_session=False)
+    if not removed:
+        db.session.rollback()
+        return jsonify({"error": "Product not found in cart"}), 404
+
+    db.session.commit()
+    return jsonify(cart_summary(current_user.id)), 200
+
+
+# POST /api/cart/merge — Merge a list of {productId, quantity} lines
+# (e.g. a guest cart at login) in a single statement
+@cart_routes.route("/merge", methods=["POST"])
+@login_required
+def merge_cart():
+    data = request.get_json(silent=True) or {}
+    items = data.get("items")
+    if not isinstance(items, list) or not items:
+        return jsonify({"errors": {"items": "Items must be a non-empty list."}}), 400
+
+    quantities = {}
+    errors = {}
+    for index, item in enumerate(items):
+        product_id = item.get("productId") if isinstance(item, dict) else None
+        quantity = parse_quantity(item.get("quantity", 1)) if isinstance(item, dict) else None
+        if isinstance(product_id, bool) or not isinstance(product_id, int) or quantity is None:
+            errors[str(index)] = f"Each item needs an integer productId and a quantity between 1 and {MAX_QUANTITY}."
+            continue
+        # a product listed twice is merged here, since one upsert
+        # statement may not touch the same row twice
+        quantities[product_id] = min(quantities.get(product_id, 0) + quantity, MAX_QUANTITY)
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    found = {
+        product_id for (product_id,) in
+        db.session.query(Product.id).filter(Product.id.in_(quantities))
+    }
+    missing = sorted(set(quantities) - found)
+    if missing:
+        return jsonify({"errors": {"productIds": f"Products not found: {missing}"}}), 404
+
+    upsert_cart_lines(current_user.id, quantities)
+    db.session.commit()
+    return jsonify(cart_summary(current_user.id)), 200
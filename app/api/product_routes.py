@@ -1,26 +1,270 @@
-from flask import Blueprint, request, jsonify
+import base64
+import hashlib
+import json
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from flask import Blueprint, current_app, request, jsonify
 from flask_login import login_required, current_user
-from app.models import db, Product
+from sqlalchemy import func, literal, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import selectinload
+from werkzeug.datastructures import MultiDict
+from app.forms import ProductForm
+from app.models import db, Product, User
+from app.cache import cache, conditional
+from app.export import export_response, parse_export_args
+from app.search import reindex_products, search_products
 
 product_routes = Blueprint('product_routes', __name__, url_prefix='/api/products')
 
-# GET all products
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# sort name -> (key column, descending?)
+# every sort is keyset-paginated on (key column, id) so deep pages cost the
+# same as the first one
+SORTS = {
+    'newest': (Product.created_at, True),
+    'oldest': (Product.created_at, False),
+    'price_asc': (Product.price, False),
+    'price_desc': (Product.price, True),
+    'top_rated': (Product.average_rating, True),
+}
+
+
+def encode_cursor(sort, product):
+    key = getattr(product, SORTS[sort][0].key)
+    key = key.isoformat() if isinstance(key, datetime) else str(key)
+    raw = json.dumps([sort, key, product.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """
+    Turns an opaque cursor back into the (key, id) pair it was built from.
+    Raises ValueError if the cursor is malformed or belongs to another sort.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, key, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_sort != sort:
+            raise ValueError('Cursor does not match sort order.')
+        if SORTS[sort][0] is Product.created_at:
+            key = datetime.fromisoformat(key)
+        else:
+            key = Decimal(key)
+        return key, int(last_id)
+    except (TypeError, ValueError, InvalidOperation, json.JSONDecodeError) as e:
+        raise ValueError('Invalid cursor.') from e
+
+
+def parse_catalog_args(args):
+    """
+    Validates the catalog query string. Returns (options, errors).
+    """
+    errors = {}
+    options = {}
+
+    sort = args.get('sort', 'newest')
+    if sort not in SORTS:
+        errors['sort'] = f"Sort must be one of: {', '.join(SORTS)}."
+    options['sort'] = sort
+
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+        if limit < 1:
+            raise ValueError
+        options['limit'] = min(limit, MAX_PAGE_SIZE)
+    except ValueError:
+        errors['limit'] = 'Limit must be a positive integer.'
+
+    for name in ('min_price', 'max_price'):
+        value = args.get(name)
+        if value is None:
+            options[name] = None
+            continue
+        try:
+            options[name] = Decimal(value)
+        except InvalidOperation:
+            errors[name] = 'Price must be a number.'
+
+    seller_id = args.get('seller_id')
+    try:
+        options['seller_id'] = int(seller_id) if seller_id is not None else None
+    except ValueError:
+        errors['seller_id'] = 'Seller id must be an integer.'
+
+    cursor = args.get('cursor')
+    options['cursor'] = None
+    if cursor and 'sort' not in errors:
+        try:
+            options['cursor'] = decode_cursor(cursor, sort)
+        except ValueError as e:
+            errors['cursor'] = str(e)
+
+    return options, errors
+
+
+def catalog_version_statement(options):
+    # the ids and edit times (ratings included) of the rows on the page
+    return catalog_statement(options, (Product.id, Product.updated_at))
+
+
+def catalog_validators(options, rows):
+    """
+    (etag, last_modified) for one catalog page from its
+    catalog_version_statement rows. The ETag hashes the page itself, so it
+    costs one keyset query however big the table gets. There is no
+    Last-Modified: deleting a product doesn't move any remaining row's
+    updated_at. Shared with the async routes in app/asgi.py, as is
+    product_validators.
+    """
+    page = [[id, updated_at.timestamp() if updated_at else 0] for id, updated_at in rows]
+    digest = hashlib.sha1(json.dumps([options['sort'], options['limit'], page]).encode()).hexdigest()
+    return f'catalog-{digest}', None
+
+
+def catalog_version():
+    options, errors = parse_catalog_args(request.args)
+    if errors:
+        return None
+    return catalog_validators(options, db.session.execute(catalog_version_statement(options)).all())
+
+
+def product_validators(id, updated_at):
+    if updated_at is None:
+        return None
+    return f'product-{id}-{updated_at.timestamp()}', updated_at
+
+
+def product_version(id):
+    updated_at = db.session.query(Product.updated_at).filter(Product.id == id).scalar()
+    return product_validators(id, updated_at)
+
+
+def seller_products_version():
+    count, updated_at = db.session.query(func.count(Product.id), func.max(Product.updated_at)) \
+        .filter(Product.seller_id == current_user.id).one()
+    stamp = updated_at.timestamp() if updated_at else 0
+    # no Last-Modified for a list; see catalog_validators
+    return f'seller-{current_user.id}-{count}-{stamp}', None
+
+
+def catalog_statement(options, columns=None):
+    """
+    SELECT for one catalog page (plus one extra row to tell whether there is
+    a next one). Shared by this blueprint and the async routes in app/asgi.py.
+    With `columns` it selects just those instead of the products.
+    """
+    statement = db.select(*columns) if columns else Product.listing_select()
+    if options['min_price'] is not None:
+        statement = statement.where(Product.price >= options['min_price'])
+    if options['max_price'] is not None:
+        statement = statement.where(Product.price <= options['max_price'])
+    if options['seller_id'] is not None:
+        statement = statement.where(Product.seller_id == options['seller_id'])
+
+    key_column, descending = SORTS[options['sort']]
+    if options['cursor']:
+        last_key, last_id = options['cursor']
+        position = tuple_(key_column, Product.id)
+        last_seen = tuple_(literal(last_key, key_column.type), literal(last_id, Product.id.type))
+        if descending:
+            statement = statement.where(position < last_seen)
+        else:
+            statement = statement.where(position > last_seen)
+    if descending:
+        statement = statement.order_by(key_column.desc(), Product.id.desc())
+    else:
+        statement = statement.order_by(key_column.asc(), Product.id.asc())
+    return statement.limit(options['limit'] + 1)
+
+
+def catalog_page(options, products):
+    """
+    Response body for a catalog page fetched with catalog_statement.
+    """
+    limit = options['limit']
+    next_cursor = None
+    if len(products) > limit:
+        products = products[:limit]
+        next_cursor = encode_cursor(options['sort'], products[-1])
+    return {
+        "products": [product.to_dict() for product in products],
+        "next_cursor": next_cursor
+    }
+
+
+# GET products, one keyset page at a time
+# ?limit=&cursor=&sort=newest|oldest|price_asc|price_desc|top_rated&min_price=&max_price=&seller_id=
 @product_routes.route('/')
+@conditional(catalog_version)
+@cache.cached('catalog')
 def get_all_products():
-    products = Product.query.all()
-    return jsonify([product.to_dict() for product in products]), 200
+    options, errors = parse_catalog_args(request.args)
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    products = db.session.scalars(catalog_statement(options)).all()
+    return jsonify(catalog_page(options, products)), 200
+
+# GET products ranked by full-text match on title and description
+# ?q=&limit=&offset=
+@product_routes.route('/search')
+@cache.cached('catalog')
+def search():
+    errors = {}
+    query = request.args.get('q', '').strip()
+    if not query:
+        errors['q'] = 'Search query is required.'
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        offset = int(request.args.get('offset', 0))
+        if limit < 1 or offset < 0:
+            raise ValueError
+    except ValueError:
+        errors['limit'] = 'Limit must be a positive integer and offset non-negative.'
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    # fetch one extra row to know whether there is a next page
+    products = search_products(query, limit + 1, offset)
+    next_offset = offset + limit if len(products) > limit else None
+    return jsonify({
+        "products": [product.to_dict() for product in products[:limit]],
+        "next_offset": next_offset
+    }), 200
+
+# GET the full catalog as a download, streamed in id order
+# ?format=ndjson|csv&after_id=&limit=
+@product_routes.route('/export')
+def export_products():
+    options, errors = parse_export_args(request.args)
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    statement = db.select(
+        Product.id, Product.seller_id, User.username.label('seller_username'),
+        Product.title, Product.description, Product.price, Product.cover_image_url,
+        Product.created_at, Product.updated_at, Product.review_count, Product.average_rating,
+    ).outerjoin(User, User.id == Product.seller_id)
+    return export_response('products', statement, Product.id, options)
 
 # GET single product by ID
 @product_routes.route('/<int:id>')
+@conditional(product_version)
+@cache.cached(lambda id: f'product:{id}')
 def get_product(id):
-    product = Product.query.get_or_404(id)
+    product = Product.listing_query().get_or_404(id)
     return jsonify(product.to_dict()), 200
 
 # GET current user's products (for manage view)
 @product_routes.route('/manage')
 @login_required
+@conditional(seller_products_version)
 def manage_products():
-    products = Product.query.filter_by(seller_id=current_user.id).all()
+    products = Product.listing_query().filter_by(seller_id=current_user.id).all()
     return jsonify([product.to_dict() for product in products]), 200
 
 # POST - create a product
@@ -39,6 +283,7 @@ def create_product():
 
     db.session.add(product)
     db.session.commit()
+    cache.invalidate('catalog')
     return jsonify(product.to_dict()), 201
 
 # PUT - update a product
@@ -57,6 +302,7 @@ def update_product(id):
     product.cover_image_url = data.get('cover_image_url', product.cover_image_url)
 
     db.session.commit()
+    cache.invalidate('catalog', f'product:{id}')
     return jsonify(product.to_dict()), 200
 
 # DELETE - delete a product
@@ -70,4 +316,226 @@ def delete_product(id):
 
     db.session.delete(product)
     db.session.commit()
-    return jsonify({"message": "Product deleted"}), 200
\ No newline at end of file
+    cache.invalidate('catalog', f'product:{id}')
+    return jsonify({"message": "Product deleted"}), 200
+
+
+# Bulk endpoints. Each takes a JSON array, {"products": [...]} or NDJSON
+# (Content-Type: application/x-ndjson, one item per line), and answers with
+# one result per item, in order: {"index", "status", "id"} or
+# {"index", "status": "error", "errors"}. Writes are committed
+# BULK_CHUNK_SIZE items at a time.
+
+BULK_FIELDS = ('title', 'description', 'price', 'cover_image_url')
+
+
+def read_bulk_items():
+    """
+    The items of a bulk request. Returns (items, error); a malformed NDJSON
+    line comes back as a None item so it still gets its own result.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        items = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(None)
+    else:
+        data = request.get_json(silent=True)
+        items = data.get('products') if isinstance(data, dict) else data
+
+    if not isinstance(items, list) or not items:
+        return None, 'Send a non-empty JSON array, {"products": [...]} or NDJSON.'
+    max_items = current_app.config['BULK_MAX_ITEMS']
+    if len(items) > max_items:
+        return None, f'At most {max_items} items per request.'
+    return items, None
+
+
+def validate_product(item):
+    """
+    Runs one item through ProductForm. Returns (column values, errors).
+    """
+    if not isinstance(item, dict):
+        return None, {'item': 'Each item must be a JSON object.'}
+    formdata = MultiDict({
+        name: '' if item[name] is None else str(item[name])
+        for name in BULK_FIELDS if name in item
+    })
+    form = ProductForm(formdata=formdata, meta={'csrf': False})
+    if not form.validate():
+        return None, form.errors
+    values = {name: form.data[name] for name in BULK_FIELDS}
+    values['cover_image_url'] = values['cover_image_url'] or None
+    return values, None
+
+
+def item_id(item):
+    value = item.get('id') if isinstance(item, dict) else item
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return None
+
+
+def write_in_chunks(entries, write):
+    """
+    Calls write(chunk) for BULK_CHUNK_SIZE (result, item) pairs at a time,
+    committing after each. A chunk the database rejects is rolled back and
+    its items marked failed; earlier chunks stay committed.
+    """
+    size = current_app.config['BULK_CHUNK_SIZE']
+    for start in range(0, len(entries), size):
+        chunk = entries[start:start + size]
+        try:
+            write(chunk)
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            for result, _ in chunk:
+                if result.get('status') != 'error':
+                    result.pop('id', None)
+                    result.update(status='error', errors={'database': 'This chunk could not be saved.'})
+
+
+def bulk_response(results, changed_ids=()):
+    cache.invalidate('catalog', *(f'product:{id}' for id in changed_ids))
+    counts = Counter(result['status'] for result in results)
+    return jsonify({"results": results, "counts": counts}), 207 if counts['error'] else 200
+
+
+def error_result(result, errors):
+    result.update(status='error', errors=errors)
+
+
+# POST - create many products
+@product_routes.route('/bulk', methods=['POST'])
+@login_required
+def bulk_create_products():
+    """
+    Creates products from an array or NDJSON of {title, description, price, cover_image_url}
+    """
+    items, error = read_bulk_items()
+    if error:
+        return jsonify({"errors": {"products": error}}), 400
+
+    results = [{'index': index} for index in range(len(items))]
+    valid = []
+    for result, item in zip(results, items):
+        values, errors = validate_product(item)
+        if errors:
+            error_result(result, errors)
+        else:
+            valid.append((result, values))
+
+    seller_id = current_user.id
+
+    def create(chunk):
+        ids = Product.insert_many([dict(values, seller_id=seller_id) for _, values in chunk])
+        reindex_products(ids)
+        for (result, _), id in zip(chunk, ids):
+            result.update(status='created', id=id)
+
+    write_in_chunks(valid, create)
+    return bulk_response(results)
+
+
+# PUT - update many of the current user's products
+@product_routes.route('/bulk', methods=['PUT'])
+@login_required
+def bulk_update_products():
+    """
+    Updates products from an array or NDJSON of {id, ...fields to change}
+    """
+    items, error = read_bulk_items()
+    if error:
+        return jsonify({"errors": {"products": error}}), 400
+
+    results = [{'index': index} for index in range(len(items))]
+    entries = []
+    for result, item in zip(results, items):
+        if not isinstance(item, dict) or item_id(item) is None:
+            error_result(result, {'id': 'Each item needs an integer id.'})
+        else:
+            entries.append((result, item))
+
+    seller_id = current_user.id
+    changed = []
+
+    def update(chunk):
+        products = {
+            product.id: product
+            for product in Product.query.filter(Product.id.in_([item['id'] for _, item in chunk]))
+        }
+        for result, item in chunk:
+            product = products.get(item['id'])
+            if product is None:
+                error_result(result, {'id': 'Product not found.'})
+                continue
+            if product.seller_id != seller_id:
+                error_result(result, {'id': 'Unauthorized.'})
+                continue
+            current = {name: getattr(product, name) for name in BULK_FIELDS}
+            values, errors = validate_product({**current, **item})
+            if errors:
+                error_result(result, errors)
+                continue
+            for name, value in values.items():
+                setattr(product, name, value)
+            result.update(status='updated', id=product.id)
+        db.session.flush()
+        changed.extend(result['id'] for result, _ in chunk if result.get('status') == 'updated')
+
+    write_in_chunks(entries, update)
+    return bulk_response(results, changed)
+
+
+# DELETE - delete many of the current user's products
+@product_routes.route('/bulk', methods=['DELETE'])
+@login_required
+def bulk_delete_products():
+    """
+    Deletes products from an array or NDJSON of ids (or {id} objects)
+    """
+    items, error = read_bulk_items()
+    if error:
+        return jsonify({"errors": {"products": error}}), 400
+
+    results = [{'index': index} for index in range(len(items))]
+    entries = []
+    for result, item in zip(results, items):
+        if item_id(item) is None:
+            error_result(result, {'id': 'Each item must be an integer id or {"id": ...}.'})
+        else:
+            entries.append((result, item_id(item)))
+
+    seller_id = current_user.id
+    changed = []
+
+    def delete(chunk):
+        # the cascaded rows are loaded up front, a few queries per chunk
+        # rather than three per product
+        products = {
+            product.id: product
+            for product in Product.query.options(
+                selectinload(Product.reviews),
+                selectinload(Product.cart_items),
+                selectinload(Product.wish_list_items),
+            ).filter(Product.id.in_([id for _, id in chunk]))
+        }
+        for result, id in chunk:
+            product = products.get(id)
+            if product is None:
+                error_result(result, {'id': 'Product not found.'})
+            elif product.seller_id != seller_id:
+                error_result(result, {'id': 'Unauthorized.'})
+            else:
+                db.session.delete(product)
+                result.update(status='deleted', id=id)
+        db.session.flush()
+        changed.extend(id for result, id in chunk if result.get('status') == 'deleted')
+
+    write_in_chunks(entries, delete)
+    return bulk_response(results, changed)
@@ -1,15 +1,26 @@
 from flask import Blueprint, request
-from app.models import Review, db
+from app.models import Product, Review, REVIEW_DEPTHS, db
 from flask_login import login_required, current_user
 from app.forms.review_form import ReviewForm
+from app.cache import cache
+from app.export import export_response, parse_export_args
 
 review_routes = Blueprint('reviews', __name__)
 
+
+def requested_depth():
+    # ?depth=ids|summary|full, listings default to the compact summary
+    depth = request.args.get('depth', 'summary')
+    return depth if depth in REVIEW_DEPTHS else None
+
 # Get all reviews for a specific product
 @review_routes.route('/products/<int:product_id>/reviews', methods=['GET'])
 def get_reviews(product_id):
-    reviews = Review.query.filter_by(product_id=product_id).all()
-    return [review.to_dict() for review in reviews], 200
+    depth = requested_depth()
+    if depth is None:
+        return {'errors': {'depth': f"Depth must be one of: {', '.join(REVIEW_DEPTHS)}."}}, 400
+    reviews = Review.listing_query(depth).filter_by(product_id=product_id).all()
+    return [review.to_dict(depth) for review in reviews], 200
 
 # Create a new review for a specific product
 @review_routes.route('/products/<int:product_id>/reviews', methods=['POST'])
@@ -27,17 +38,35 @@ def create_review(product_id):
             content=form.data['content']
         )
         db.session.add(new_review)
+        Product.record_rating_change(product_id, added=new_review.rating)
         db.session.commit()
+        cache.invalidate('catalog', f'product:{product_id}')
         return new_review.to_dict(), 201
 
     return {'errors': form.errors}, 400
 
+# Get every review as a download, streamed in id order
+# ?format=ndjson|csv&after_id=&limit=
+@review_routes.route('/reviews/export', methods=['GET'])
+def export_reviews():
+    options, errors = parse_export_args(request.args)
+    if errors:
+        return {'errors': errors}, 400
+    statement = db.select(
+        Review.id, Review.product_id, Review.user_id, Review.rating,
+        Review.title, Review.content, Review.created_at, Review.updated_at,
+    )
+    return export_response('reviews', statement, Review.id, options)
+
 # Get current user's reviews
 @review_routes.route('/my-reviews', methods=['GET'])
 @login_required
 def get_my_reviews():
-    reviews = Review.query.filter_by(user_id=current_user.id).all()
-    return [review.to_dict() for review in reviews], 200
+    depth = requested_depth()
+    if depth is None:
+        return {'errors': {'depth': f"Depth must be one of: {', '.join(REVIEW_DEPTHS)}."}}, 400
+    reviews = Review.listing_query(depth).filter_by(user_id=current_user.id).all()
+    return [review.to_dict(depth) for review in reviews], 200
 
 # Update an existing review by ID
 @review_routes.route('/reviews/<int:review_id>', methods=['PUT'])
@@ -51,10 +80,12 @@ def update_review(review_id):
     form['csrf_token'].data = request.cookies.get('csrf_token')
 
     if form.validate_on_submit():
+        Product.record_rating_change(review.product_id, added=form.data['rating'], removed=review.rating)
         review.rating = form.data['rating']
         review.title = form.data['title']
         review.content = form.data['content']
         db.session.commit()
+        cache.invalidate('catalog', f'product:{review.product_id}')
         return review.to_dict(), 200
 
     return {'errors': form.errors}, 400
@@ -68,5 +99,7 @@ def delete_review(review_id):
         return {'error': 'Unauthorized'}, 403
 
     db.session.delete(review)
+    Product.record_rating_change(review.product_id, removed=review.rating)
     db.session.commit()
+    cache.invalidate('catalog', f'product:{review.product_id}')
     return {'message': 'Review deleted successfully'}, 204
@@ -1,39 +1,216 @@
 from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
-from app.models import db, Wishlist, Product
+from datetime import datetime
+from sqlalchemy import func, literal, literal_column
+from sqlalchemy.exc import IntegrityError
+from app.models import db, Wishlist, Product, dialect_insert
+from app.cache import conditional
 
 wishlist_routes = Blueprint("wishlist", __name__)
 
+
+MAX_WISHLIST_PAGE_SIZE = 500
+# product ids per membership check or bulk add/remove
+MAX_BATCH_IDS = 500
+
+
+def parse_wishlist_args(args):
+    """
+    Validates the wishlist query string (?fields=ids&limit=&cursor=).
+    Returns (options, errors).
+    """
+    errors = {}
+    options = {'ids_only': False, 'limit': None, 'cursor': 0}
+
+    fields = args.get('fields')
+    if fields not in (None, 'ids'):
+        errors['fields'] = 'Fields must be "ids" or omitted.'
+    options['ids_only'] = fields == 'ids'
+
+    limit = args.get('limit')
+    try:
+        if limit is not None:
+            options['limit'] = int(limit)
+            if options['limit'] < 1:
+                raise ValueError
+            options['limit'] = min(options['limit'], MAX_WISHLIST_PAGE_SIZE)
+    except ValueError:
+        errors['limit'] = 'Limit must be a positive integer.'
+
+    try:
+        options['cursor'] = int(args.get('cursor', 0))
+        if options['cursor'] < 0:
+            raise ValueError
+    except ValueError:
+        errors['cursor'] = 'Invalid cursor.'
+
+    return options, errors
+
+
+def wishlist_version_statement(user_id):
+    # the payload also carries product fields, so product edits count too
+    return db.select(
+        func.count(Wishlist.id),
+        func.max(Wishlist.created_at),
+        func.max(Product.updated_at)
+    ).join(Product, Product.id == Wishlist.product_id) \
+        .where(Wishlist.user_id == user_id)
+
+
+def wishlist_validators(user_id, options, version):
+    """
+    (etag, last_modified) for one representation of a user's wishlist,
+    from the row wishlist_version_statement returned. The full list, the
+    ids-only list and each page are different bodies, so each gets its own
+    ETag. The row count in it moves on a removal; the timestamps wouldn't,
+    so there is no Last-Modified. Shared with the async routes in app/asgi.py.
+    """
+    count, added_at, product_updated_at = version
+    stamps = [stamp for stamp in (added_at, product_updated_at) if stamp]
+    variant = f"{'ids' if options['ids_only'] else 'items'}-{options['limit']}-{options['cursor']}"
+    etag = f"wishlist-{user_id}-{variant}-{count}-" + "-".join(str(stamp.timestamp()) for stamp in stamps)
+    return etag, None
+
+
+def wishlist_version():
+    options, errors = parse_wishlist_args(request.args)
+    if errors:
+        return None
+    version = db.session.execute(wishlist_version_statement(current_user.id)).one()
+    return wishlist_validators(current_user.id, options, version)
+
+
+def wishlist_statement(user_id, options=None):
+    """
+    One user's wishlist rows with the product columns the response needs,
+    in a single joined SELECT. Shared with the async routes in app/asgi.py.
+
+    With ids_only it reads just product ids, ordered by product id so the
+    (user_id, product_id) unique index covers the whole query. A limit
+    fetches one row past the page to tell whether there is a next one.
+    """
+    options = options or {'ids_only': False, 'limit': None, 'cursor': 0}
+    if options['ids_only']:
+        statement = db.select(Wishlist.product_id)
+        key_column = Wishlist.product_id
+    else:
+        statement = db.select(
+            Wishlist.id,
+            Wishlist.product_id,
+            Product.title,
+            Product.cover_image_url,
+            Product.price,
+        ).join(Product, Product.id == Wishlist.product_id)
+        key_column = Wishlist.id
+
+    statement = statement.where(Wishlist.user_id == user_id)
+    if options['cursor']:
+        statement = statement.where(key_column > options['cursor'])
+    statement = statement.order_by(key_column)
+    if options['limit'] is not None:
+        statement = statement.limit(options['limit'] + 1)
+    return statement
+
+
+def wishlist_item(row):
+    return {
+        "id": row.id,
+        "productId": row.product_id,
+        "title": row.title,
+        "coverImageUrl": row.cover_image_url,
+        "price": str(row.price),
+    }
+
+
+def wishlist_payload(options, rows):
+    """
+    Response body for rows fetched with wishlist_statement. Without a limit
+    the full list keeps its original shape (an array of items, or
+    {"productIds": [...]}); pages come back as {"items"|"productIds",
+    "nextCursor"}.
+    """
+    next_cursor = None
+    if options['limit'] is not None and len(rows) > options['limit']:
+        rows = rows[:options['limit']]
+        last = rows[-1]
+        next_cursor = str(last.product_id if options['ids_only'] else last.id)
+
+    if options['ids_only']:
+        payload = {"productIds": [row.product_id for row in rows]}
+    elif options['limit'] is None:
+        return [wishlist_item(row) for row in rows]
+    else:
+        payload = {"items": [wishlist_item(row) for row in rows]}
+    if options['limit'] is not None:
+        payload["nextCursor"] = next_cursor
+    return payload
+
 # GET /api/wishlist — Return all products in current user's wishlist
+# ?fields=ids for product ids only, ?limit=&cursor= to page through it
 @wishlist_routes.route("/", methods=["GET"])
 @login_required
+@conditional(wishlist_version)
 def get_wishlist():
-    wishlist_items = Wishlist.query.filter_by(user_id=current_user.id).all()
-    return jsonify([
-        {
-            "id": item.id,
-            "productId": item.product_id,
-            "title": item.product.title,
-            "coverImageUrl": item.product.cover_image_url,
-            "price": str(item.product.price),
-        } for item in wishlist_items
-    ])
-
-# POST /api/wishlist/<int:product_id> — Add to wishlist
+    options, errors = parse_wishlist_args(request.args)
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    rows = db.session.execute(wishlist_statement(current_user.id, options)).all()
+    return jsonify(wishlist_payload(options, rows))
+
+def add_wishlist_row(user_id, product_id):
+    """
+    Wishlists a product in one INSERT ... SELECT on the (user_id,
+    product_id) unique index, so a double click can't add it twice or fail.
+    The SELECT reads the product row, so an unknown product inserts nothing
+    (sqlite doesn't enforce the foreign key). Returns (id, created), where
+    id is the existing row's when it was already wishlisted, or None if
+    the product doesn't exist.
+    """
+    product_row = db.select(
+        literal(user_id), Product.id, literal(datetime.utcnow())
+    ).where(Product.id == product_id)
+    stmt = dialect_insert(Wishlist).from_select(["user_id", "product_id", "created_at"], product_row)
+    if db.session.get_bind().dialect.name == "postgresql":
+        # a no-op update on conflict makes RETURNING report the existing
+        # row too; xmax is only 0 on a row this statement inserted
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "product_id"],
+            set_={"user_id": stmt.excluded.user_id}
+        ).returning(Wishlist.id, literal_column("xmax = 0").label("created"))
+        row = db.session.execute(stmt).first()
+        return (row.id, row.created) if row else None
+
+    # sqlite (development) has no RETURNING here, but it also runs one
+    # writer at a time, so the follow-up read can't race another insert
+    result = db.session.execute(stmt.on_conflict_do_nothing(index_elements=["user_id", "product_id"]))
+    if result.rowcount:
+        return result.lastrowid, True
+    existing = db.session.scalar(
+        db.select(Wishlist.id).where(Wishlist.user_id == user_id, Wishlist.product_id == product_id)
+    )
+    return (existing, False) if existing else None
+
+# POST /api/wishlist/<int:product_id> — Add to wishlist (idempotent)
 @wishlist_routes.route("/<int:product_id>", methods=["POST"])
 @login_required
 def add_to_wishlist(product_id):
-    existing = Wishlist.query.filter_by(user_id=current_user.id, product_id=product_id).first()
-    if existing:
-        return jsonify({"error": "Product is already in wishlist"}), 400
-
-    wishlist_item = Wishlist(user_id=current_user.id, product_id=product_id)
-    db.session.add(wishlist_item)
-    db.session.commit()
+    try:
+        added = add_wishlist_row(current_user.id, product_id)
+        db.session.commit()
+    except IntegrityError:
+        # postgres: the product was deleted between the SELECT and the insert
+        added = None
+        db.session.rollback()
+    if added is None:
+        return jsonify({"error": "Product not found"}), 404
 
+    id, created = added
+    if not created:
+        return jsonify({"message": "Product is already in wishlist", "id": id}), 200
     return jsonify({
         "message": "Product added to wishlist",
-        "id": wishlist_item.id
+        "id": id
     }), 201
 
 # DELETE /api/wishlist/<int:product_id> — Remove from wishlist
@@ -46,4 +223,92 @@ def remove_from_wishlist(product_id):
 
     db.session.delete(item)
     db.session.commit()
-    return jsonify({"message": "Product removed from wishlist"}), 200
\ No newline at end of file
+    return jsonify({"message": "Product removed from wishlist"}), 200
+
+
+def parse_product_ids(values):
+    """
+    Deduplicated list of product ids, or None unless `values` is a
+    non-empty list of at most MAX_BATCH_IDS integers.
+    """
+    if not isinstance(values, list) or not values or len(values) > MAX_BATCH_IDS:
+        return None
+    if any(isinstance(value, bool) or not isinstance(value, int) for value in values):
+        return None
+    return list(dict.fromkeys(values))
+
+
+def product_ids_error():
+    return jsonify({"errors": {"productIds": f"Product ids must be a list of 1 to {MAX_BATCH_IDS} integers."}}), 400
+
+
+# GET /api/wishlist/contains?productIds=1,2,3 — Which of these products are
+# wishlisted, from one lookup on the (user_id, product_id) index
+@wishlist_routes.route("/contains", methods=["GET"])
+@login_required
+def wishlist_contains():
+    try:
+        product_ids = parse_product_ids([int(value) for value in request.args.get("productIds", "").split(",") if value])
+    except ValueError:
+        product_ids = None
+    if product_ids is None:
+        return product_ids_error()
+
+    wishlisted = set(db.session.scalars(
+        db.select(Wishlist.product_id)
+        .where(Wishlist.user_id == current_user.id, Wishlist.product_id.in_(product_ids))
+    ))
+    return jsonify({"wishlisted": {str(product_id): product_id in wishlisted for product_id in product_ids}})
+
+
+# POST /api/wishlist/bulk — Add {"productIds": [...]} with one INSERT ...
+# SELECT like add_wishlist_row; ones already wishlisted are skipped by
+# ON CONFLICT DO NOTHING
+@wishlist_routes.route("/bulk", methods=["POST"])
+@login_required
+def bulk_add_to_wishlist():
+    data = request.get_json(silent=True) or {}
+    product_ids = parse_product_ids(data.get("productIds"))
+    if product_ids is None:
+        return product_ids_error()
+
+    found = set(db.session.scalars(db.select(Product.id).where(Product.id.in_(product_ids))))
+    missing = sorted(set(product_ids) - found)
+    if missing:
+        return jsonify({"errors": {"productIds": f"Products not found: {missing}"}}), 404
+
+    product_rows = db.select(
+        literal(current_user.id), Product.id, literal(datetime.utcnow())
+    ).where(Product.id.in_(product_ids))
+    stmt = dialect_insert(Wishlist) \
+        .from_select(["user_id", "product_id", "created_at"], product_rows) \
+        .on_conflict_do_nothing(index_elements=["user_id", "product_id"])
+    try:
+        added = db.session.execute(stmt).rowcount
+        db.session.commit()
+    except IntegrityError:
+        # postgres: a product was deleted between the SELECT and the insert
+        db.session.rollback()
+        missing = sorted(set(product_ids) - set(db.session.scalars(
+            db.select(Product.id).where(Product.id.in_(product_ids))
+        )))
+        return jsonify({"errors": {"productIds": f"Products not found: {missing}"}}), 404
+    return jsonify({"added": added}), 200
+
+
+# DELETE /api/wishlist/bulk — Remove {"productIds": [...]} in one statement
+@wishlist_routes.route("/bulk", methods=["DELETE"])
+@login_required
+def bulk_remove_from_wishlist():
+    data = request.get_json(silent=True) or {}
+    product_ids = parse_product_ids(data.get("productIds"))
+    if product_ids is None:
+        return product_ids_error()
+
+    removed = db.session.execute(
+        db.delete(Wishlist)
+        .where(Wishlist.user_id == current_user.id, Wishlist.product_id.in_(product_ids))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return jsonify({"removed": removed}), 200
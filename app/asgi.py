@@ -0,0 +1,257 @@
+"""
+ASGI entry point. The hot read endpoints of product_routes and
+wishlist_routes are served natively on asyncio with an async SQLAlchemy
+engine; everything else is passed through to the Flask app unchanged.
+
+    gunicorn app.asgi:application -k uvicorn.workers.UvicornWorker
+
+A worker waiting on the database for one of these reads keeps serving
+others, so concurrency isn't capped at one request per worker thread.
+"""
+import asyncio
+import os
+import re
+import time
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import http_date, parse_cookie, quote_etag
+
+from app import CORS_ORIGINS, app as flask_app, csrf_cookie_is_fresh
+from app.api.product_routes import (
+    catalog_page, catalog_statement, catalog_validators, catalog_version_statement,
+    parse_catalog_args, product_validators
+)
+from app.api.wishlist_routes import (
+    parse_wishlist_args, wishlist_payload, wishlist_statement, wishlist_validators,
+    wishlist_version_statement
+)
+from app.cache import LocalCacheBackend, cache, cache_variant, http_last_modified
+from app.metrics import metrics
+from app.models import Product
+from app.pool import TimedAsyncQueuePool, pool_monitor
+
+# sync driver -> asyncio driver for the same database
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_url(url):
+    url = make_url(url)
+    url = url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+    # asyncpg spells libpq's sslmode as ssl
+    if 'sslmode' in url.query:
+        url = url.update_query_dict({'ssl': url.query['sslmode']}).difference_update_query(['sslmode'])
+    return url
+
+
+class AsyncAPI:
+    """
+    ASGI app serving the routes below on an async engine, with the Flask
+    app (run in a thread pool of ASGI_WSGI_THREADS) as the fallback for every other
+    request. A handler returning None also falls back, so Flask keeps the
+    final say on anything unusual: 404s, remember-me logins and so on.
+
+    Native responses carry what the Flask path would send: the same body
+    bytes, ETag and Last-Modified, CORS headers and the same response cache
+    entries. Requests Flask's hooks would answer differently (conditional
+    headers, the production HTTPS redirect, a foreign Origin, a CSRF cookie
+    to issue) go to Flask. These reads always use the primary database.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WSGIMiddleware(flask_app, workers=flask_app.config.get('ASGI_WSGI_THREADS', 10))
+        self.engine = None
+        self.sessions = None
+        self.routes = [
+            (re.compile(r'^/api/products/$'), 'async.get_all_products', self.get_all_products),
+            (re.compile(r'^/api/products/(\d+)$'), 'async.get_product', self.get_product),
+            (re.compile(r'^/api/wishlist/$'), 'async.get_wishlist', self.get_wishlist),
+        ]
+
+    def start(self):
+        config = self.flask_app.config
+        url = config['SQLALCHEMY_DATABASE_URI']
+        options = pool_monitor.engine_options(self.flask_app, url, poolclass=TimedAsyncQueuePool)
+        self.engine = create_async_engine(async_url(url), echo=config.get('SQLALCHEMY_ECHO', False), **options)
+        self.sessions = sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        pool_monitor.watch('async', self.engine.sync_engine)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        # conditional requests go to Flask, which answers them with a 304
+        headers = dict(scope.get('headers', ()))
+        conditional = b'if-none-match' in headers or b'if-modified-since' in headers
+        if scope['type'] == 'http' and scope['method'] == 'GET' and not conditional:
+            for pattern, endpoint, handler in self.routes:
+                match = pattern.match(scope['path'])
+                if match is None:
+                    continue
+                cookies = parse_cookie(headers.get(b'cookie', b'').decode('latin-1'))
+                session = self.load_session(cookies)
+                if self.needs_flask(headers, cookies, session):
+                    break
+                if self.engine is None:
+                    self.start()
+                started = time.perf_counter()
+                result = await handler(scope, session, *match.groups())
+                if result is not None:
+                    status, body, validators = result
+                    await self.send_json(send, status, body, validators, headers.get(b'origin'))
+                    metrics.observe_request(endpoint, 'GET', status, time.perf_counter() - started)
+                    return
+                break
+
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.engine is not None:
+                    await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    def needs_flask(headers, cookies, session):
+        """
+        True when the app's before/after_request hooks or flask-cors would
+        change the response: the production HTTP -> HTTPS redirect, an
+        Origin outside CORS_ORIGINS, or a browser due a new CSRF cookie.
+        """
+        if os.environ.get('FLASK_ENV') == 'production' and headers.get(b'x-forwarded-proto') == b'http':
+            return True
+        origin = headers.get(b'origin')
+        if origin is not None and origin.decode('latin-1') not in CORS_ORIGINS:
+            return True
+        return not csrf_cookie_is_fresh(session, cookies)
+
+    def json_body(self, payload):
+        # byte-for-byte what jsonify sends, so either path can serve the
+        # other's response cache entries
+        return (self.flask_app.json.dumps(payload, separators=(',', ':')) + '\n').encode()
+
+    @staticmethod
+    async def send_json(send, status, body, validators=None, origin=None):
+        headers = [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ]
+        if validators is not None:
+            etag, last_modified = validators
+            headers.append((b'etag', quote_etag(etag).encode()))
+            if last_modified is not None:
+                headers.append((b'last-modified', http_date(http_last_modified(last_modified)).encode()))
+        headers += [
+            (b'access-control-allow-origin', origin or CORS_ORIGINS[0].encode()),
+            (b'access-control-allow-credentials', b'true'),
+            (b'vary', b'Cookie'),
+        ]
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    def load_session(self, cookies):
+        """
+        The contents of Flask's signed session cookie, or {} without a valid one.
+        """
+        value = cookies.get(self.flask_app.config['SESSION_COOKIE_NAME'])
+        serializer = self.flask_app.session_interface.get_signing_serializer(self.flask_app)
+        if not value or serializer is None:
+            return {}
+        try:
+            return serializer.loads(value, max_age=int(self.flask_app.permanent_session_lifetime.total_seconds()))
+        except BadSignature:
+            return {}
+
+    @staticmethod
+    def session_user_id(session):
+        try:
+            return int(session['_user_id'])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    async def call_cache(method, *args):
+        # the Redis client blocks, so keep it off the event loop
+        if isinstance(cache.backend, LocalCacheBackend):
+            return method(*args)
+        return await asyncio.to_thread(method, *args)
+
+    async def cached_body(self, scope, session, namespace, etag, build):
+        """
+        The response cache entry ResponseCache.cached would use for this
+        request, or `build()`'s body, stored there. Like the Flask path, a
+        browser inside its db_primary_until window refreshes the entry
+        rather than reading it.
+        """
+        if cache.backend is None:
+            return await build()
+        full_path = f"{scope['path']}?{scope['query_string'].decode('utf-8', 'replace')}"
+        variant = cache_variant(full_path, etag)
+        if session.get('db_primary_until', 0) <= time.time():
+            body = await self.call_cache(cache.get_body, namespace, variant)
+            if body is not None:
+                return body
+        body = await build()
+        await self.call_cache(cache.set_body, namespace, variant, body)
+        return body
+
+    # GET /api/products/ — same contract as product_routes.get_all_products
+    async def get_all_products(self, scope, session):
+        args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+        options, errors = parse_catalog_args(args)
+        if errors:
+            return 400, self.json_body({"errors": errors}), None
+        async with self.sessions() as db_session:
+            rows = (await db_session.execute(catalog_version_statement(options))).all()
+            validators = catalog_validators(options, rows)
+
+            async def build():
+                products = (await db_session.scalars(catalog_statement(options))).all()
+                return self.json_body(catalog_page(options, products))
+
+            return 200, await self.cached_body(scope, session, 'catalog', validators[0], build), validators
+
+    # GET /api/products/<id> — same contract as product_routes.get_product
+    async def get_product(self, scope, session, id):
+        async with self.sessions() as db_session:
+            product = (await db_session.scalars(Product.listing_select().where(Product.id == int(id)))).first()
+            if product is None:
+                return None
+            validators = product_validators(product.id, product.updated_at)
+
+            async def build():
+                return self.json_body(product.to_dict())
+
+            return 200, await self.cached_body(scope, session, f'product:{id}', validators[0], build), validators
+
+    # GET /api/wishlist/ — same contract as wishlist_routes.get_wishlist
+    async def get_wishlist(self, scope, session):
+        user_id = self.session_user_id(session)
+        if user_id is None:
+            return None
+        args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+        options, errors = parse_wishlist_args(args)
+        if errors:
+            return 400, self.json_body({"errors": errors}), None
+        async with self.sessions() as db_session:
+            version = (await db_session.execute(wishlist_version_statement(user_id))).one()
+            rows = (await db_session.execute(wishlist_statement(user_id, options))).all()
+            return 200, self.json_body(wishlist_payload(options, rows)), wishlist_validators(user_id, options, version)
+
+
+application = AsyncAPI(flask_app)
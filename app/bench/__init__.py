@@ -0,0 +1,137 @@
+import json
+import sys
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app.metrics import metrics
+from app.models import db, Product, User
+from app.models.db import environment
+from app.seeds.synthetic import USERNAME_PREFIX, seed_synthetic
+from .runner import ENDPOINTS, Dataset, compare, run_benchmark, run_http_benchmark
+
+# Creates a bench group to hold our commands
+# So we can type `flask bench --help`
+bench_commands = AppGroup('bench')
+
+
+# Creates the `flask bench run` command, e.g.
+#   DATABASE_URL=sqlite:///bench.db flask bench run --reset --products 20000 -o before.json
+@bench_commands.command('run')
+@click.option('--reset', is_flag=True, help='Drop and recreate every table first.')
+@click.option('--users', default=200, show_default=True)
+@click.option('--products', default=5000, show_default=True)
+@click.option('--reviews', default=20000, show_default=True)
+@click.option('--wishlists', default=5000, show_default=True)
+@click.option('--requests', 'request_count', default=200, show_default=True, help='Timed requests per endpoint.')
+@click.option('--concurrency', default=8, show_default=True)
+@click.option('--warmup', default=20, show_default=True)
+@click.option('--seed', default=0, show_default=True)
+@click.option('--endpoint', 'only', multiple=True, help='Only run endpoints whose name starts with this.')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='Write the results as JSON here.')
+def run(reset, users, products, reviews, wishlists, request_count, concurrency, warmup, seed, only, output):
+    if environment == 'production':
+        raise click.UsageError('Refusing to benchmark against the production database.')
+    if wishlists > users * products:
+        raise click.UsageError('Wishlists can be at most users x products; each pair is wishlisted once.')
+    if reset:
+        # the primary only; replica binds follow it through replication
+        db.drop_all(bind_key=None)
+        db.create_all(bind_key=None)
+
+    started = datetime.utcnow()
+    click.echo(f'Seeding {users} users, {products} products, {reviews} reviews, {wishlists} wishlist rows...')
+    user_ids, product_ids = seed_synthetic(users, products, reviews, wishlists, seed=seed)
+
+    endpoints = [endpoint for endpoint in ENDPOINTS if not only or endpoint.name.startswith(only)]
+    click.echo(f'Running {len(endpoints)} endpoints x {request_count} requests at concurrency {concurrency}...')
+    results = run_benchmark(current_app._get_current_object(), Dataset(user_ids, product_ids), endpoints,
+                            requests=request_count, concurrency=concurrency, warmup=warmup, seed=seed)
+
+    echo_results(results, 'queries', lambda result: result['queries_per_request']['mean'])
+
+    # app-wide event counters (e.g. CSRF tokens issued vs skipped)
+    counters = dict(metrics.events)
+    for name, count in sorted(counters.items()):
+        click.echo(f'{name}: {count}')
+
+    if output:
+        write_report(output, {
+            'started_at': started.isoformat(),
+            'database': db.engine.url.render_as_string(hide_password=True),
+            'dataset': {'users': users, 'products': products, 'reviews': reviews, 'wishlists': wishlists},
+            'requests': request_count,
+            'concurrency': concurrency,
+            'warmup': warmup,
+            'seed': seed,
+        }, results, counters)
+
+
+# Creates the `flask bench http` command, which loads a running server over
+# HTTP, e.g. to compare the sync and ASGI deployments at high concurrency:
+#   gunicorn app:app -w 4                                          (sync)
+#   gunicorn app.asgi:application -w 4 -k uvicorn.workers.UvicornWorker   (async)
+#   flask bench http http://localhost:8000 --concurrency 200 --endpoint products -o sync.json
+# Run `flask bench run --reset` (or `flask seed synthetic`) first, against
+# the same DATABASE_URL as the server.
+@bench_commands.command('http')
+@click.argument('base_url')
+@click.option('--requests', 'request_count', default=2000, show_default=True, help='Timed requests per endpoint.')
+@click.option('--concurrency', default=100, show_default=True)
+@click.option('--warmup', default=100, show_default=True)
+@click.option('--seed', default=0, show_default=True)
+@click.option('--endpoint', 'only', multiple=True, help='Only run endpoints whose name starts with this.')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='Write the results as JSON here.')
+def run_http(base_url, request_count, concurrency, warmup, seed, only, output):
+    user_ids = [user_id for user_id, in db.session.query(User.id).filter(User.username.startswith(USERNAME_PREFIX))]
+    product_ids = [product_id for product_id, in db.session.query(Product.id)]
+    if not user_ids or not product_ids:
+        raise click.UsageError('No synthetic data; run `flask bench run --reset` against this database first.')
+
+    started = datetime.utcnow()
+    endpoints = [endpoint for endpoint in ENDPOINTS if not only or endpoint.name.startswith(only)]
+    click.echo(f'Running {len(endpoints)} endpoints x {request_count} requests at concurrency {concurrency} '
+               f'against {base_url}...')
+    results = run_http_benchmark(base_url, Dataset(user_ids, product_ids), endpoints,
+                                 requests=request_count, concurrency=concurrency, warmup=warmup, seed=seed)
+    echo_results(results, 'db conns', lambda result: result['db_connections_peak'] or '-')
+
+    if output:
+        write_report(output, {
+            'started_at': started.isoformat(),
+            'server': base_url,
+            'database': db.engine.url.render_as_string(hide_password=True),
+            'requests': request_count,
+            'concurrency': concurrency,
+            'warmup': warmup,
+            'seed': seed,
+        }, results, {})
+
+
+def echo_results(results, last_column, last_value):
+    click.echo(f"{'endpoint':<28}{'rps':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{last_column:>10}{'errors':>8}")
+    for name, result in results.items():
+        latency = result['latency_ms']
+        click.echo(f"{name:<28}{result['rps']:>9}{latency['p50']:>10}{latency['p90']:>10}{latency['p99']:>10}"
+                   f"{last_value(result):>10}{result['errors']:>8}")
+
+
+def write_report(output, meta, results, counters):
+    with open(output, 'w') as f:
+        json.dump({'meta': meta, 'endpoints': results, 'counters': counters}, f, indent=2)
+    click.echo(f'Wrote {output}')
+
+
+# Creates the `flask bench compare` command; exits 1 on a regression
+@bench_commands.command('compare')
+@click.argument('baseline', type=click.File())
+@click.argument('current', type=click.File())
+@click.option('--threshold', default=0.10, show_default=True, help='Allowed relative slowdown.')
+def compare_runs(baseline, current, threshold):
+    lines, regressed = compare(json.load(baseline), json.load(current), threshold)
+    for line in lines:
+        click.echo(line)
+    if regressed:
+        sys.exit(1)
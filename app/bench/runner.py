@@ -0,0 +1,331 @@
+import http.client
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+
+from sqlalchemy import event, text
+
+from app.models import db
+from app.seeds.synthetic import SYNTHETIC_PASSWORD, USERNAME_PREFIX, WORDS
+
+
+class Endpoint:
+    """
+    One benchmarked route. `path` (and `json`, for writes) are functions of
+    a random.Random and the dataset, so every request can pick a different
+    product or search term.
+    """
+
+    def __init__(self, name, method, path, json=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.json = json
+
+
+# grouped by blueprint; every worker is logged in, as a browser session would be
+ENDPOINTS = [
+    Endpoint('products.catalog', 'GET', lambda rng, data: '/api/products/?limit=20'),
+    Endpoint('products.catalog_top_rated', 'GET',
+             lambda rng, data: '/api/products/?limit=20&sort=top_rated'),
+    Endpoint('products.detail', 'GET',
+             lambda rng, data: f'/api/products/{rng.choice(data.product_ids)}'),
+    Endpoint('products.search', 'GET',
+             lambda rng, data: f'/api/products/search?q={rng.choice(WORDS)}'),
+    Endpoint('products.manage', 'GET', lambda rng, data: '/api/products/manage'),
+    Endpoint('reviews.for_product', 'GET',
+             lambda rng, data: f'/api/products/{rng.choice(data.product_ids)}/reviews'),
+    Endpoint('reviews.mine', 'GET', lambda rng, data: '/api/my-reviews'),
+    Endpoint('wishlist.list', 'GET', lambda rng, data: '/api/wishlist/'),
+    Endpoint('cart.summary', 'GET', lambda rng, data: '/api/cart/'),
+    Endpoint('cart.add', 'POST',
+             lambda rng, data: f'/api/cart/{rng.choice(data.product_ids)}', json=lambda rng, data: {'quantity': 1}),
+    Endpoint('auth.authenticate', 'GET', lambda rng, data: '/api/auth/'),
+    Endpoint('auth.login', 'POST', lambda rng, data: '/api/auth/login',
+             json=lambda rng, data: {'email': f'{USERNAME_PREFIX}{rng.choice(data.user_ids)}@example.com',
+                                     'password': SYNTHETIC_PASSWORD}),
+    Endpoint('users.detail', 'GET', lambda rng, data: f'/api/users/{rng.choice(data.user_ids)}'),
+]
+
+
+class Dataset:
+    def __init__(self, user_ids, product_ids):
+        self.user_ids = list(user_ids)
+        self.product_ids = list(product_ids)
+
+
+def percentile(ordered, fraction):
+    # nearest-rank percentile of an already sorted list
+    if not ordered:
+        return None
+    rank = max(int(round(fraction * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def log_in(post, email, attempts=50):
+    """
+    Logs one benchmark client in through `post(path, json)`, which returns
+    the status. Setting up dozens of clients at once overruns the password
+    hashing limit (app/hashing.py), so 429s are retried after a pause.
+    """
+    for attempt in range(attempts):
+        status = post('/api/auth/login', {'email': email, 'password': SYNTHETIC_PASSWORD})
+        if status != 429:
+            break
+        time.sleep(0.05 * (attempt + 1))
+    if status != 200:
+        raise RuntimeError(f'Benchmark login failed for {email}: {status}')
+
+
+class QueryCounter:
+    """
+    Counts statements executed on the current thread; the test client runs
+    each request on the thread that sent it.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+
+def run_benchmark(app, dataset, endpoints=ENDPOINTS, requests=200, concurrency=8, warmup=20, seed=0):
+    """
+    Sends `requests` requests to each endpoint from `concurrency` threads,
+    each holding its own logged-in session, and returns per-endpoint
+    throughput, latency percentiles (ms) and SQL statements per request.
+    """
+    counter = QueryCounter()
+    local = threading.local()
+    lock = threading.Lock()
+    worker_seeds = iter(range(seed, seed + 1_000_000))
+
+    def client():
+        if not hasattr(local, 'client'):
+            with lock:
+                local.rng = random.Random(next(worker_seeds))
+            local.client = app.test_client()
+            local.client.get('/api/csrf/restore')
+            email = f'{USERNAME_PREFIX}{local.rng.choice(dataset.user_ids)}@example.com'
+            log_in(lambda path, body: local.client.post(path, json=body).status_code, email)
+        return local.client, local.rng
+
+    def send(endpoint):
+        test_client, rng = client()
+        path = endpoint.path(rng, dataset)
+        body = endpoint.json(rng, dataset) if endpoint.json else None
+        counter.reset()
+        started = time.perf_counter()
+        response = test_client.open(path, method=endpoint.method, json=body)
+        elapsed = time.perf_counter() - started
+        return elapsed, counter.count, response.status_code
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', counter)
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            # log every worker in before timing anything
+            list(pool.map(lambda _: client(), range(concurrency * 4)))
+            for endpoint in endpoints:
+                list(pool.map(lambda _: send(endpoint), range(warmup)))
+                started = time.perf_counter()
+                samples = list(pool.map(lambda _: send(endpoint), range(requests)))
+                wall = time.perf_counter() - started
+                results[endpoint.name] = summarize(samples, wall)
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+    return results
+
+
+class HttpClient:
+    """
+    Minimal keep-alive HTTP client with a cookie jar, one per benchmark
+    thread, so a real server sees the same browser-like sessions the test
+    client runs use.
+    """
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.hostname, parts.port, timeout=60)
+        self.cookies = {}
+
+    def open(self, path, method='GET', json_body=None):
+        headers = {}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        if 'csrf_token' in self.cookies:
+            headers['X-CSRFToken'] = self.cookies['csrf_token']
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body)
+            headers['Content-Type'] = 'application/json'
+        for attempt in range(2):
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                # an idle keep-alive connection the server closed is retried
+                # once on a new one, as a browser would; anything else is an error
+                self.connection.close()
+        else:
+            return 599
+        for header in response.headers.get_all('Set-Cookie') or ():
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        return response.status
+
+
+class ConnectionSampler:
+    """
+    Polls how many connections the app's database has open (Postgres only)
+    in the background, keeping the peak since the last reset.
+    """
+
+    QUERY = text('SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()')
+
+    def __init__(self, engine, interval=0.05):
+        self.engine = engine
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if self.engine.dialect.name == 'postgresql':
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        with self.engine.connect() as connection:
+            while not self._stop.wait(self.interval):
+                # our own sampling connection isn't the app's
+                count = connection.execute(self.QUERY).scalar() - 1
+                self.peak = count if self.peak is None else max(self.peak, count)
+
+    def reset(self):
+        peak, self.peak = self.peak, None
+        return peak
+
+
+def run_http_benchmark(base_url, dataset, endpoints=ENDPOINTS, requests=200, concurrency=8, warmup=20, seed=0):
+    """
+    run_benchmark against a running server (e.g. gunicorn, sync or ASGI)
+    over HTTP. Statements per request aren't visible from here; instead
+    each endpoint reports the peak number of database connections seen
+    while it ran (Postgres only).
+    """
+    local = threading.local()
+    lock = threading.Lock()
+    worker_seeds = iter(range(seed, seed + 1_000_000))
+
+    def client():
+        if not hasattr(local, 'client'):
+            with lock:
+                local.rng = random.Random(next(worker_seeds))
+            local.client = HttpClient(base_url)
+            local.client.open('/api/csrf/restore')
+            email = f'{USERNAME_PREFIX}{local.rng.choice(dataset.user_ids)}@example.com'
+            log_in(lambda path, body: local.client.open(path, 'POST', body), email)
+        return local.client, local.rng
+
+    def send(endpoint):
+        http_client, rng = client()
+        path = endpoint.path(rng, dataset)
+        body = endpoint.json(rng, dataset) if endpoint.json else None
+        started = time.perf_counter()
+        status = http_client.open(path, endpoint.method, body)
+        return time.perf_counter() - started, None, status
+
+    results = {}
+    with ConnectionSampler(db.engine) as sampler, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: client(), range(concurrency * 4)))
+        for endpoint in endpoints:
+            list(pool.map(lambda _: send(endpoint), range(warmup)))
+            sampler.reset()
+            started = time.perf_counter()
+            samples = list(pool.map(lambda _: send(endpoint), range(requests)))
+            wall = time.perf_counter() - started
+            results[endpoint.name] = summarize(samples, wall)
+            results[endpoint.name]['db_connections_peak'] = sampler.reset()
+    return results
+
+
+def summarize(samples, wall):
+    latencies = sorted(elapsed * 1000 for elapsed, _, _ in samples)
+    queries = [count for _, count, _ in samples if count is not None]
+    errors = sum(1 for _, _, status in samples if status >= 400)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'rps': round(len(samples) / wall, 1) if wall else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'p50': round(percentile(latencies, 0.50), 3),
+            'p90': round(percentile(latencies, 0.90), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+            'max': round(latencies[-1], 3),
+        },
+        'queries_per_request': {
+            'mean': round(sum(queries) / len(queries), 2),
+            'max': max(queries),
+        } if queries else None,
+    }
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Lines describing each shared endpoint's change, plus whether any
+    p50/p99 latency or throughput moved the wrong way by more than
+    `threshold`.
+    """
+    lines = []
+    regressed = False
+    for name in sorted(set(baseline['endpoints']) & set(current['endpoints'])):
+        old, new = baseline['endpoints'][name], current['endpoints'][name]
+        changes = {
+            'p50': change(old['latency_ms']['p50'], new['latency_ms']['p50']),
+            'p99': change(old['latency_ms']['p99'], new['latency_ms']['p99']),
+            'rps': change(old['rps'], new['rps']),
+        }
+        worse = changes['p50'] > threshold or changes['p99'] > threshold or changes['rps'] < -threshold
+        regressed = regressed or worse
+        lines.append(
+            f"{name:<28} p50 {changes['p50']:+7.1%}  p99 {changes['p99']:+7.1%}  "
+            f"rps {changes['rps']:+7.1%}  queries {mean_queries(old)} -> "
+            f"{mean_queries(new)}{'  REGRESSION' if worse else ''}"
+        )
+    return lines, regressed
+
+
+def mean_queries(result):
+    # HTTP runs can't see the server's statements
+    return result['queries_per_request']['mean'] if result['queries_per_request'] else '-'
+
+
+def change(old, new):
+    if not old:
+        return 0.0
+    return (new - old) / old
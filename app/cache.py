@@ -0,0 +1,291 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+from functools import wraps
+
+from flask import Response, g, make_response, request
+
+
+class LocalCacheBackend:
+    """
+    In-process cache: a size-bounded LRU whose entries also expire after a
+    TTL. Each gunicorn worker gets its own copy.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, key):
+        # counters live outside the LRU so a version is never evicted
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'local',
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+            }
+
+
+class RedisCacheBackend:
+    """
+    Shared cache every worker sees, so one worker's invalidation applies to
+    all of them. Expiry uses Redis TTLs and eviction is left to the server's
+    maxmemory policy. `client` is anything with the redis-py get/set/incr/
+    info methods, which lets tests pass a local stand-in.
+    """
+
+    def __init__(self, client, prefix='cache:'):
+        self.client = client
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('CACHE_BACKEND=redis requires the redis package.') from e
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def get_counter(self, key):
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+    def stats(self):
+        with self._lock:
+            stats = {'backend': 'redis', 'hits': self.hits, 'misses': self.misses}
+        # evictions are server-wide, not just this app's keys
+        stats['evictions'] = int(self.client.info('stats').get('evicted_keys', 0))
+        return stats
+
+
+class ResponseCache:
+    """
+    Caches the serialized body of successful JSON GET responses.
+
+    Entries are grouped into namespaces (e.g. 'catalog', 'product:3'). Each
+    namespace has a version number that is part of every key, so
+    invalidate() drops a whole namespace by bumping one counter. A request
+    that read the old version before the bump can only write back under
+    the old key, which nobody reads any more.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = 60
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('CACHE_TTL', 60)
+        kind = app.config.get('CACHE_BACKEND', 'local')
+        if kind == 'redis':
+            self.backend = RedisCacheBackend.from_url(app.config['CACHE_REDIS_URL'])
+        elif kind == 'local':
+            self.backend = LocalCacheBackend(app.config.get('CACHE_MAX_ENTRIES', 1024))
+        elif kind == 'none':
+            self.backend = None
+        else:
+            raise ValueError(f'Unknown CACHE_BACKEND: {kind}')
+        app.extensions['response_cache'] = self
+
+    def _key(self, namespace, variant):
+        version = self.backend.get_counter(f'version:{namespace}')
+        return f'{namespace}:v{version}:{variant}'
+
+    def invalidate(self, *namespaces):
+        if self.backend is None:
+            return
+        for namespace in namespaces:
+            self.backend.incr(f'version:{namespace}')
+
+    def stats(self):
+        if self.backend is None:
+            return {'backend': 'none'}
+        return self.backend.stats()
+
+    def metric_lines(self):
+        # counters in the Prometheus text format, for /api/metrics
+        stats = self.stats()
+        lines = []
+        for name in ('hits', 'misses', 'evictions', 'expirations'):
+            if name in stats:
+                lines += [
+                    f'# TYPE response_cache_{name}_total counter',
+                    f'response_cache_{name}_total{{backend="{stats["backend"]}"}} {stats[name]}',
+                ]
+        if 'entries' in stats:
+            lines += [
+                '# TYPE response_cache_entries gauge',
+                f'response_cache_entries{{backend="{stats["backend"]}"}} {stats["entries"]}',
+            ]
+        return lines
+
+    def get_body(self, namespace, variant):
+        if self.backend is None:
+            return None
+        return self.backend.get(self._key(namespace, variant))
+
+    def set_body(self, namespace, variant, body):
+        if self.backend is not None:
+            self.backend.set(self._key(namespace, variant), body, self.ttl)
+
+    def cached(self, namespace):
+        """
+        View decorator. `namespace` is a string or a function of the view's
+        arguments; the path and query string distinguish entries within it.
+        Under @conditional the resource's ETag is part of the key too, so a
+        cached body is only ever served with the ETag it was built for.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.backend is None:
+                    return view(*args, **kwargs)
+
+                name = namespace(*args, **kwargs) if callable(namespace) else namespace
+                variant = cache_variant(request.full_path, g.get('resource_etag'))
+                # set by app/replicas.py for a browser that just wrote; it
+                # reads from the primary and refreshes the entry instead
+                body = None if g.get('skip_cached_responses') else self.get_body(name, variant)
+                if body is not None:
+                    return Response(body, status=200, mimetype='application/json')
+
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    self.set_body(name, variant, response.get_data())
+                return response
+            return wrapper
+        return decorator
+
+
+def cache_variant(full_path, etag=None):
+    # the entry key within a namespace; app/asgi.py builds the same one
+    return f'{full_path}#{etag}' if etag else full_path
+
+
+def http_last_modified(last_modified):
+    # HTTP dates have one-second resolution
+    if last_modified is None:
+        return None
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def conditional(version):
+    """
+    View decorator for conditional GETs. `version` is called with the view's
+    arguments and returns (etag, last_modified) from a cheap query, or None
+    if the resource doesn't exist. A matching If-None-Match (or, if absent,
+    If-Modified-Since) gets a 304 without running the view at all.
+    Collections return a None last_modified, since removing an item doesn't
+    move the newest timestamp left; they are only ever matched by ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            current = version(*args, **kwargs)
+            if current is None:
+                return view(*args, **kwargs)
+
+            etag, last_modified = current
+            # for cache.cached underneath, see ResponseCache.cached
+            g.resource_etag = etag
+            last_modified = http_last_modified(last_modified)
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = bool(since and last_modified and last_modified <= since)
+
+            if not_modified:
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            return response
+        return wrapper
+    return decorator
+
+
+cache = ResponseCache()
@@ -11,4 +11,63 @@ class Config:
     # so the connection uri must be updated here (for production)
     SQLALCHEMY_DATABASE_URI = os.environ.get(
         'DATABASE_URL').replace('postgres://', 'postgresql://')
-    SQLALCHEMY_ECHO = True
+    # Optional comma-separated read replica URLs; GET requests read from
+    # them round-robin, everything else uses DATABASE_URL
+    DATABASE_REPLICA_URLS = [
+        url.strip().replace('postgres://', 'postgresql://')
+        for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()
+    ]
+    # after a write, that browser reads from the primary for this many seconds
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+    # a failed replica is skipped this long; healthy ones are re-checked
+    # at most every REPLICA_CHECK_INTERVAL seconds
+    REPLICA_RETRY_AFTER = int(os.environ.get('REPLICA_RETRY_AFTER', 30))
+    REPLICA_CHECK_INTERVAL = int(os.environ.get('REPLICA_CHECK_INTERVAL', 10))
+    # Bulk product endpoints: items per request, and per transaction
+    BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', 10000))
+    BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', 500))
+    # Rows fetched per round trip by the streaming catalog/review exports
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+    # Threads per worker for the Flask routes when serving through app/asgi.py
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 10))
+    # Connection pool per app worker (Postgres only; sqlite keeps its own).
+    # Size workers so workers * (size + overflow) stays under max_connections.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_POOL_MAX_OVERFLOW = int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10))
+    # seconds to wait for a free connection before erroring
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+    # connections older than this (seconds) are replaced; -1 disables
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    # test connections on checkout so ones dropped while idle are replaced
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+    # CSRF cookies are only re-issued once they're this close (seconds) to
+    # WTF_CSRF_TIME_LIMIT, or when the browser doesn't have the current one
+    CSRF_REFRESH_MARGIN = int(os.environ.get('CSRF_REFRESH_MARGIN', 300))
+    # werkzeug password hashing, e.g. 'pbkdf2:sha256:600000'. Raising the
+    # iterations costs more CPU per login; stored hashes are upgraded the
+    # next time their user logs in.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+    PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH', 16))
+    # Hashing runs in this many processes per app worker (0 = inline); past
+    # workers + queue limit concurrent hashes, requests get a 429. Keep that
+    # sum below the worker's request threads so the limit can bite.
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', 4))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    PASSWORD_HASH_RETRY_AFTER = int(os.environ.get('PASSWORD_HASH_RETRY_AFTER', 1))
+    # Statement logging is opt-in; /api/metrics covers routine visibility
+    SQLALCHEMY_ECHO = os.environ.get('SQLALCHEMY_ECHO', '').lower() in ('1', 'true', 'yes')
+    # A request repeating one statement this many times is flagged as an N+1
+    METRICS_N_PLUS_ONE_THRESHOLD = int(os.environ.get('METRICS_N_PLUS_ONE_THRESHOLD', 5))
+    # If set, /api/metrics and /api/cache/stats require "Authorization:
+    # Bearer <token>"; in production they aren't served at all without one
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # Response cache for public catalog reads: 'local' (per worker LRU),
+    # 'redis' (shared, needs CACHE_REDIS_URL) or 'none'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'local')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', 60))
+    # Logged-in user rows cached per worker for flask-login; 0 disables
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 30))
+    IDENTITY_CACHE_MAX_ENTRIES = int(os.environ.get('IDENTITY_CACHE_MAX_ENTRIES', 10000))
@@ -6,17 +6,14 @@ from app.models import User
 
 def user_exists(form, field):
     # Checking if user exists
-    email = field.data
-    user = User.query.filter(User.email == email).first()
-    if not user:
+    if not form.user:
         raise ValidationError('Email provided not found.')
 
 
 def password_matches(form, field):
     # Checking if password matches
     password = field.data
-    email = form.data['email']
-    user = User.query.filter(User.email == email).first()
+    user = form.user
     if not user:
         raise ValidationError('No such user exists.')
     if not user.check_password(password):
@@ -25,4 +22,11 @@ def password_matches(form, field):
 
 class LoginForm(FlaskForm):
     email = StringField('email', validators=[DataRequired(), user_exists])
-    password = StringField('password', validators=[DataRequired(), password_matches])
\ No newline at end of file
+    password = StringField('password', validators=[DataRequired(), password_matches])
+
+    @property
+    def user(self):
+        # Looked up once per form; the validators and the login view share it
+        if not hasattr(self, '_user'):
+            self._user = User.query.filter(User.email == self.data['email']).first()
+        return self._user
@@ -0,0 +1,27 @@
+from flask_wtf import FlaskForm
+from wtforms import DecimalField, StringField, TextAreaField
+from wtforms.validators import DataRequired, InputRequired, Length, NumberRange, Optional
+
+class ProductForm(FlaskForm):
+    title = StringField(
+        'Title',
+        validators=[
+            DataRequired(message='Title is required.'),
+            Length(max=100, message='Title must be under 100 characters long.')
+        ])
+    description = TextAreaField(
+        'Description',
+        validators=[DataRequired(message='Description is required.')])
+    price = DecimalField(
+        'Price',
+        places=2,
+        validators=[
+            InputRequired(message='Price is required.'),
+            NumberRange(min=0, max=99999999.99, message='Price must be between 0 and 99999999.99.')
+        ])
+    cover_image_url = StringField(
+        'Cover Image URL',
+        validators=[
+            Optional(),
+            Length(max=255, message='Cover image URL must be under 255 characters long.')
+        ])
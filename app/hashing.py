@@ -0,0 +1,167 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.metrics import Histogram, LATENCY_BUCKETS
+
+
+class HashingBusy(Exception):
+    """
+    Raised when too many hashes are already queued; the app turns it into
+    a 429 with Retry-After.
+    """
+
+    def __init__(self, retry_after):
+        super().__init__('Password hashing is saturated.')
+        self.retry_after = retry_after
+
+
+# These run in the pool's processes, so they return their own timings.
+
+def _generate(password, method, salt_length):
+    started = time.time()
+    hashed = generate_password_hash(password, method=method, salt_length=salt_length)
+    return hashed, started, time.time() - started
+
+
+def _check(hashed, password):
+    started = time.time()
+    matches = check_password_hash(hashed, password)
+    return matches, started, time.time() - started
+
+
+def pool_context():
+    """
+    Start method for the pool's processes. A plain fork would copy this
+    process while its other request threads may hold locks (logging, the
+    allocator, a connection pool) that then never get released in the
+    child. A forkserver is a separate single-threaded process to fork from;
+    it imports this module once so each child starts with it loaded.
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+class HashingPool:
+    """
+    Runs password hashing, the CPU-heavy part of signup and login, in a
+    process pool so a burst of logins can't take over every request thread.
+
+    Each app process admits at most `workers + queue_limit` hashes: one
+    running per pool process plus a short queue. Past that, callers get
+    HashingBusy right away instead of queueing. The defaults (2 + 4) sit
+    below the request threads of one process (gunicorn's gthread workers
+    in the Dockerfile, or ASGI_WSGI_THREADS under app/asgi.py), so a burst
+    is turned away while threads are still free for other requests. A slot
+    is held until its hash actually finishes, even if the caller gave up
+    waiting for it. With `workers` = 0 hashing runs inline on the request
+    thread, still behind the same limit.
+    """
+
+    def __init__(self, app=None):
+        self.workers = 2
+        self.timeout = 10
+        self.retry_after = 1
+        self._slots = None
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+        self.queue_wait = Histogram(LATENCY_BUCKETS)
+        self.hash_time = Histogram(LATENCY_BUCKETS)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 10)
+        self.retry_after = app.config.get('PASSWORD_HASH_RETRY_AFTER', 1)
+        queue_limit = app.config.get('PASSWORD_HASH_QUEUE_LIMIT', 4)
+        self._slots = threading.BoundedSemaphore(max(self.workers, 1) + queue_limit)
+        app.extensions['hashing_pool'] = self
+
+    def _pool(self):
+        # created on first use in each process, i.e. after gunicorn forks
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=pool_context())
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _release(self, future=None):
+        with self._lock:
+            self.in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    def _run(self, func, *args):
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy(self.retry_after)
+
+        with self._lock:
+            self.in_flight += 1
+        submitted = time.time()
+        if self.workers > 0:
+            try:
+                future = self._pool().submit(func, *args)
+            except BaseException:
+                self._release()
+                raise
+            # the slot goes back when the hash is done (or cancelled), not
+            # when this caller stops waiting, so abandoned hashes still count
+            future.add_done_callback(self._release)
+            try:
+                result, started, seconds = future.result(timeout=self.timeout)
+            except TimeoutError:
+                future.cancel()
+                with self._lock:
+                    self.rejected += 1
+                raise HashingBusy(self.retry_after)
+        else:
+            try:
+                result, started, seconds = func(*args)
+            finally:
+                self._release()
+        with self._lock:
+            self.queue_wait.observe(('pool',), max(started - submitted, 0.0))
+            self.hash_time.observe(('pool',), seconds)
+        return result
+
+    def generate(self, password, method, salt_length):
+        return self._run(_generate, password, method, salt_length)
+
+    def check(self, hashed, password):
+        return self._run(_check, hashed, password)
+
+    def metric_lines(self):
+        # counters in the Prometheus text format, for /api/metrics
+        with self._lock:
+            lines = [
+                '# TYPE password_hash_in_flight gauge',
+                f'password_hash_in_flight {self.in_flight}',
+                '# TYPE password_hash_rejected_total counter',
+                f'password_hash_rejected_total {self.rejected}',
+            ]
+            for name, histogram in (('password_hash_queue_wait_seconds', self.queue_wait),
+                                    ('password_hash_seconds', self.hash_time)):
+                lines.append(f'# TYPE {name} histogram')
+                for _, (counts, total, count) in histogram.series.items():
+                    for bound, bucket_count in zip(histogram.buckets, counts):
+                        lines.append(f'{name}_bucket{{le="{bound}"}} {bucket_count}')
+                    lines.append(f'{name}_bucket{{le="+Inf"}} {count}')
+                    lines.append(f'{name}_sum {total:.6f}')
+                    lines.append(f'{name}_count {count}')
+        return lines
+
+
+hashing_pool = HashingPool()
@@ -0,0 +1,89 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.cache import LocalCacheBackend
+from app.models import db, User
+
+
+class IdentityCache:
+    """
+    Short-lived cache of the logged-in user's row for flask-login, so most
+    authenticated requests skip the users lookup.
+
+    It holds column values rather than ORM objects (those are tied to the
+    session that loaded them) and rebuilds a session-attached User on a hit
+    without a SELECT. Users updated or deleted through the ORM are dropped
+    when their transaction commits; the TTL bounds how long another worker
+    can keep serving its older copy.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = 30
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('IDENTITY_CACHE_TTL', 30)
+        if self.ttl > 0:
+            self.backend = LocalCacheBackend(app.config.get('IDENTITY_CACHE_MAX_ENTRIES', 10000))
+        app.extensions['identity_cache'] = self
+
+    def load_user(self, user_id):
+        if self.backend is None:
+            return User.query.get(user_id)
+
+        columns = self.backend.get(user_id)
+        if columns is not None:
+            user = User(**columns)
+            make_transient_to_detached(user)
+            return db.session.merge(user, load=False)
+
+        user = User.query.get(user_id)
+        if user is not None:
+            self.backend.set(user_id, {
+                attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs
+            }, self.ttl)
+        return user
+
+    def invalidate(self, user_id):
+        if self.backend is not None:
+            self.backend.delete(user_id)
+
+    def stats(self):
+        if self.backend is None:
+            return {'backend': 'none'}
+        return self.backend.stats()
+
+    def metric_lines(self):
+        # counters in the Prometheus text format, for /api/metrics
+        stats = self.stats()
+        lines = []
+        for name in ('hits', 'misses', 'evictions', 'expirations'):
+            if name in stats:
+                lines += [
+                    f'# TYPE identity_cache_{name}_total counter',
+                    f'identity_cache_{name}_total {stats[name]}',
+                ]
+        return lines
+
+
+identity_cache = IdentityCache()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def queue_identity_invalidation(mapper, connection, target):
+    session = Session.object_session(target)
+    session.info.setdefault('identity_cache_stale', set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_identities(session):
+    for user_id in session.info.pop('identity_cache_stale', ()):
+        identity_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_identity_invalidations(session):
+    session.info.pop('identity_cache_stale', None)
@@ -0,0 +1,193 @@
+import hmac
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+
+from flask import Response, abort, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 25, 50, 100)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram per label set, in the Prometheus layout.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = defaultdict(lambda: [[0] * len(buckets), 0.0, 0])
+
+    def observe(self, labels, value):
+        counts, _, _ = series = self.series[labels]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        series[1] += value
+        series[2] += 1
+
+
+class Metrics:
+    """
+    Per-process request and database metrics. Each gunicorn worker keeps
+    its own numbers; Prometheus sums them across scrape targets.
+
+    Every SQL statement is counted and timed against the request that ran
+    it. A request that runs the same statement `n_plus_one_threshold` or
+    more times is logged and counted as a likely N+1.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.requests = Counter()
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.statement_seconds = Counter()
+        self.n_plus_one = Counter()
+        self.events = Counter()
+        self.n_plus_one_threshold = 5
+        self.collectors = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.n_plus_one_threshold = app.config.get('METRICS_N_PLUS_ONE_THRESHOLD', 5)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.extensions['metrics'] = self
+
+        # every engine, including any created later
+        event.listen(Engine, 'before_cursor_execute', self._before_statement)
+        event.listen(Engine, 'after_cursor_execute', self._after_statement)
+
+    def add_collector(self, collect):
+        """
+        Registers a function returning extra exposition lines, so other
+        parts of the app can publish their own gauges here.
+        """
+        self.collectors.append(collect)
+
+    def increment(self, name):
+        """
+        Bumps a free-form counter, exported as `<name>_total`.
+        """
+        with self._lock:
+            self.events[name] += 1
+
+    def observe_request(self, endpoint, method, status, elapsed):
+        """
+        Records a request served outside Flask (the async routes in
+        app/asgi.py); SQL statements aren't attributed to those.
+        """
+        with self._lock:
+            self.requests[(endpoint, method, status)] += 1
+            self.latency.observe((endpoint,), elapsed)
+
+    def _start_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_statements = Counter()
+        g.metrics_statement_seconds = 0.0
+
+    def _before_statement(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.metrics_started = time.perf_counter()
+
+    def _after_statement(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'metrics_statements' in g:
+            started = getattr(context, 'metrics_started', None)
+            if started is not None:
+                g.metrics_statement_seconds += time.perf_counter() - started
+            g.metrics_statements[statement] += 1
+
+    def _finish_request(self, response):
+        if 'metrics_started' not in g:
+            return response
+        elapsed = time.perf_counter() - g.metrics_started
+        endpoint = request.endpoint or 'unmatched'
+        statements = g.metrics_statements
+        repeated = [(sql, count) for sql, count in statements.items() if count >= self.n_plus_one_threshold]
+
+        with self._lock:
+            self.requests[(endpoint, request.method, response.status_code)] += 1
+            self.latency.observe((endpoint,), elapsed)
+            self.statements.observe((endpoint,), sum(statements.values()))
+            self.statement_seconds[endpoint] += g.metrics_statement_seconds
+            if repeated:
+                self.n_plus_one[endpoint] += 1
+
+        for sql, count in repeated:
+            logger.warning('Possible N+1 in %s: statement ran %d times: %s', endpoint, count, ' '.join(sql.split()))
+        return response
+
+    def exposition(self):
+        """
+        Everything collected so far in the Prometheus text format.
+        """
+        lines = []
+        with self._lock:
+            lines += [
+                '# HELP http_requests_total Requests handled, by endpoint, method and status.',
+                '# TYPE http_requests_total counter',
+            ]
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+            lines += histogram_lines('http_request_duration_seconds', 'Request latency.', self.latency)
+            lines += histogram_lines('db_statements_per_request', 'SQL statements run per request.', self.statements)
+            lines += [
+                '# HELP db_statement_seconds_total Time spent executing SQL, by endpoint.',
+                '# TYPE db_statement_seconds_total counter',
+            ]
+            for endpoint, seconds in sorted(self.statement_seconds.items()):
+                lines.append(f'db_statement_seconds_total{{endpoint="{endpoint}"}} {seconds:.6f}')
+            lines += [
+                '# HELP db_n_plus_one_requests_total Requests that repeated one statement past the threshold.',
+                '# TYPE db_n_plus_one_requests_total counter',
+            ]
+            for endpoint, count in sorted(self.n_plus_one.items()):
+                lines.append(f'db_n_plus_one_requests_total{{endpoint="{endpoint}"}} {count}')
+            for name, count in sorted(self.events.items()):
+                lines += [f'# TYPE {name}_total counter', f'{name}_total {count}']
+        for collect in self.collectors:
+            lines += collect()
+        return '\n'.join(lines) + '\n'
+
+    def protected(self, view):
+        """
+        View decorator for operational endpoints. With METRICS_TOKEN set,
+        callers must send it as a bearer token; without one these endpoints
+        are only served outside production.
+        """
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            token = current_app.config.get('METRICS_TOKEN')
+            if not token:
+                if os.environ.get('FLASK_ENV') == 'production':
+                    abort(404)
+            elif not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+                abort(401)
+            return view(*args, **kwargs)
+        return wrapper
+
+    def view(self):
+        return Response(self.exposition(), mimetype='text/plain; version=0.0.4')
+
+
+def histogram_lines(name, help_text, histogram):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for (endpoint,), (counts, total, count) in sorted(histogram.series.items()):
+        for bound, bucket_count in zip(histogram.buckets, counts):
+            lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {bucket_count}')
+        lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="+Inf"}} {count}')
+        lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {total:.6f}')
+        lines.append(f'{name}_count{{endpoint="{endpoint}"}} {count}')
+    return lines
+
+
+metrics = Metrics()
@@ -6,10 +6,11 @@
 
 from .db import db
 from .db import environment, SCHEMA
+from .db import dialect_insert, reserve_ids
 
 
 from .product import Product
-from .review import Review
+from .review import Review, REVIEW_DEPTHS
 from .shoppingcart import ShoppingCart
 from .wishlist import Wishlist
 from .user import User
\ No newline at end of file
@@ -1,11 +1,29 @@
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy.dialects import postgresql, sqlite
 
 import os
 environment = os.getenv("FLASK_ENV")
 SCHEMA = os.environ.get("SCHEMA")
 
 
-db = SQLAlchemy()
+class RoutingSession(Session):
+    """
+    Sends plain SELECTs to the read replica chosen for the current request
+    (see app/replicas.py), and everything else - flushes, Core
+    INSERT/UPDATE/DELETE, raw connections - to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context():
+            replica = g.get('db_replica')
+            if replica is not None and getattr(clause, 'is_select', False):
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # helper function for adding prefix to foreign key column references in production
 def add_prefix_for_prod(attr):
@@ -13,3 +31,22 @@ def add_prefix_for_prod(attr):
         return f"{SCHEMA}.{attr}"
     else:
         return attr
+
+
+# INSERT construct for the database in use that supports ON CONFLICT clauses
+# (postgres in production, sqlite in development)
+def dialect_insert(model):
+    if db.session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+# Draws `count` ids from a postgres table's id sequence in one round trip, so
+# rows can be bulk inserted with known ids instead of RETURNING each one
+def reserve_ids(model, count):
+    table = model.__table__
+    name = f"{table.schema}.{table.name}" if table.schema else table.name
+    return [id for id, in db.session.execute(
+        db.text("SELECT nextval(pg_get_serial_sequence(:name, 'id')) FROM generate_series(1, :count)"),
+        {"name": name, "count": count}
+    )]
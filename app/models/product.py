@@ -1,14 +1,24 @@
-from .db import db, environment, SCHEMA, add_prefix_for_prod
+from .db import db, environment, SCHEMA, add_prefix_for_prod, reserve_ids
+from .user import User
+from sqlalchemy import DDL, event
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import joinedload
 from datetime import datetime
 
 class Product(db.Model):
     __tablename__ = 'products'
 
+    # keyset pagination indexes for the catalog sorts
+    __table_args__ = (
+        db.Index('ix_products_created_at_id', 'created_at', 'id'),
+        db.Index('ix_products_price_id', 'price', 'id'),
+        db.Index('ix_products_average_rating_id', 'average_rating', 'id'),
+    )
     if environment == "production":
-        __table_args__ = {'schema': SCHEMA}
+        __table_args__ = __table_args__ + ({'schema': SCHEMA},)
 
     id = db.Column(db.Integer, primary_key=True)
-    seller_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod("users.id")), nullable=False)
+    seller_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod("users.id")), nullable=False, index=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
     price = db.Column(db.Numeric(10, 2), nullable=False)
@@ -16,11 +26,141 @@ class Product(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Denormalized review aggregates, kept current by record_rating_change()
+    review_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_total = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    average_rating = db.Column(db.Numeric(3, 2), nullable=False, default=0, server_default='0')
+    rating_1_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_2_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_3_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_4_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_5_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # Full-text document over title + description (postgres only, see
+    # app/search.py); deferred so normal reads never load it
+    search_vector = db.deferred(db.Column(TSVECTOR().with_variant(db.Text, 'sqlite')))
+
     seller = db.relationship("User", back_populates="products")
     reviews = db.relationship("Review", back_populates="product", cascade="all, delete-orphan")
     cart_items = db.relationship("ShoppingCart", back_populates="product", cascade="all, delete-orphan")
     wish_list_items = db.relationship("Wishlist", back_populates="product", cascade="all, delete-orphan")
 
+    @classmethod
+    def listing_query(cls):
+        """
+        Product query for list endpoints. The seller is joined in the same
+        SELECT (only the columns to_dict needs), so serializing N products
+        never costs N extra users lookups.
+        """
+        return cls.query.options(
+            joinedload(cls.seller).load_only(User.id, User.username)
+        )
+
+    @classmethod
+    def listing_select(cls):
+        """
+        listing_query() as a select(), for Session.scalars() and the async
+        session in app/asgi.py.
+        """
+        return db.select(cls).options(
+            joinedload(cls.seller).load_only(User.id, User.username)
+        )
+
+    @classmethod
+    def insert_many(cls, rows):
+        """
+        Inserts a list of column dicts inside the caller's transaction and
+        returns their new ids, in order. On postgres the ids are reserved
+        first and the rows go out as one batched INSERT; callers must then
+        refresh their search vectors (search.reindex_products). Elsewhere
+        the ORM inserts them one by one.
+        """
+        if db.session.get_bind().dialect.name == 'postgresql':
+            ids = reserve_ids(cls, len(rows))
+            db.session.execute(db.insert(cls), [dict(row, id=id) for row, id in zip(rows, ids)])
+            return ids
+
+        products = [cls(**row) for row in rows]
+        db.session.add_all(products)
+        db.session.flush()
+        return [product.id for product in products]
+
+    @classmethod
+    def record_rating_change(cls, product_id, added=None, removed=None):
+        """
+        Applies one review's rating change to the product's aggregates with a
+        single in-place UPDATE, inside the caller's transaction. Pass `added`
+        for a new rating, `removed` for a deleted one, or both for an edit.
+        """
+        count_delta = (added is not None) - (removed is not None)
+        total_delta = (added or 0) - (removed or 0)
+        if count_delta == 0 and total_delta == 0:
+            return
+
+        new_count = cls.review_count + count_delta
+        new_total = cls.rating_total + total_delta
+        values = {
+            cls.review_count: new_count,
+            cls.rating_total: new_total,
+            cls.average_rating: db.case(
+                (new_count > 0, db.cast(new_total, db.Float) / new_count),
+                else_=0
+            ),
+        }
+        for rating, delta in ((added, 1), (removed, -1)):
+            if rating is not None:
+                column = getattr(cls, f'rating_{rating}_count')
+                values[column] = values.get(column, column) + delta
+
+        # loaded instances pick the new values up when the commit expires them
+        db.session.execute(
+            db.update(cls)
+            .where(cls.id == product_id)
+            .values(values)
+            .execution_options(synchronize_session=False)
+        )
+
+    @classmethod
+    def rebuild_rating_aggregates(cls, touch=True):
+        """
+        Recomputes every product's aggregates from the reviews table in one
+        UPDATE. Only needed after bulk loads that bypass the review routes.
+        With touch=False updated_at is left as loaded (seed data).
+        """
+        from .review import Review
+
+        def reviews_matching(column, *criteria):
+            return db.select(column) \
+                .where(Review.product_id == cls.id, *criteria) \
+                .scalar_subquery()
+
+        count = reviews_matching(db.func.count(Review.id))
+        total = reviews_matching(db.func.coalesce(db.func.sum(Review.rating), 0))
+        values = {
+            cls.review_count: count,
+            cls.rating_total: total,
+            cls.average_rating: db.case(
+                (count > 0, db.cast(total, db.Float) / count),
+                else_=0
+            ),
+        }
+        for rating in range(1, 6):
+            values[getattr(cls, f'rating_{rating}_count')] = \
+                reviews_matching(db.func.count(Review.id), Review.rating == rating)
+        if not touch:
+            # an explicit value keeps the column's onupdate from firing
+            values[cls.updated_at] = cls.updated_at
+
+        db.session.execute(
+            db.update(cls).values(values).execution_options(synchronize_session=False)
+        )
+
+    def rating_histogram(self):
+        return {
+            str(rating): getattr(self, f'rating_{rating}_count')
+            for rating in range(1, 6)
+        }
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -31,8 +171,21 @@ class Product(db.Model):
             "cover_image_url": self.cover_image_url,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
+            "review_count": self.review_count,
+            "average_rating": float(self.average_rating),
+            "rating_histogram": self.rating_histogram(),
             "seller": {
                 "id": self.seller.id,
                 "username": self.seller.username
             } if self.seller else None
-        }
\ No newline at end of file
+        }
+
+
+# GIN index over the search document, on postgres only: sqlite has no GIN and
+# leaves search_vector NULL (see app/search.py). migrations/env.py keeps
+# autogenerate from treating it as an index the model dropped.
+event.listen(
+    Product.__table__, 'after_create',
+    DDL('CREATE INDEX ix_products_search_vector ON %(fullname)s USING gin (search_vector)')
+    .execute_if(dialect='postgresql')
+)
@@ -1,8 +1,14 @@
 from .db import db, environment, SCHEMA, add_prefix_for_prod
 from werkzeug.security import generate_password_hash, check_password_hash
 from .db import db, environment, SCHEMA
+from .user import User
+from .product import Product
+from sqlalchemy.orm import selectinload
 from datetime import datetime
 
+# serialization depths, from most compact to most complete
+REVIEW_DEPTHS = ('ids', 'summary', 'full')
+
 class Review(db.Model):
     __tablename__ = 'reviews'
 
@@ -10,8 +16,8 @@ class Review(db.Model):
         __table_args__ = {'schema': SCHEMA}
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod("users.id")), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod("products.id")), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod("users.id")), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod("products.id")), nullable=False, index=True)
     rating = db.Column(db.Integer, nullable=False)
     title = db.Column(db.String(100), nullable=False)
     content = db.Column(db.Text, nullable=False)
@@ -21,8 +27,31 @@ class Review(db.Model):
     user = db.relationship("User", back_populates="reviews")
     product = db.relationship("Product", back_populates="reviews")
 
-    def to_dict(self):
-        return {
+    @classmethod
+    def listing_query(cls, depth='summary'):
+        """
+        Review query whose relationships are batch-loaded for the given
+        depth: one extra SELECT per relationship for the whole page instead
+        of one per review.
+        """
+        if depth == 'ids':
+            return cls.query
+        if depth == 'summary':
+            return cls.query.options(
+                selectinload(cls.user).load_only(User.id, User.username),
+                selectinload(cls.product).load_only(Product.id, Product.title)
+            )
+        return cls.query.options(
+            selectinload(cls.user),
+            selectinload(cls.product).joinedload(Product.seller).load_only(User.id, User.username)
+        )
+
+    def to_dict(self, depth='full'):
+        """
+        depth='ids' only references the user and product by id,
+        'summary' adds their display names, 'full' embeds both objects.
+        """
+        review = {
             'id': self.id,
             'user_id': self.user_id,
             'product_id': self.product_id,
@@ -31,6 +60,17 @@ class Review(db.Model):
             'content': self.content,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
-            'user': self.user.to_dict() if self.user else None,
-            'product': self.product.to_dict() if self.product else None
-        }
\ No newline at end of file
+        }
+        if depth == 'summary':
+            review['user'] = {
+                'id': self.user.id,
+                'username': self.user.username
+            } if self.user else None
+            review['product'] = {
+                'id': self.product.id,
+                'title': self.product.title
+            } if self.product else None
+        elif depth == 'full':
+            review['user'] = self.user.to_dict() if self.user else None
+            review['product'] = self.product.to_dict() if self.product else None
+        return review
@@ -6,12 +6,17 @@ from werkzeug.security import generate_password_hash, check_password_hash
 class ShoppingCart(db.Model):
     __tablename__ = 'shopping_cart'
 
+    # one row per product per cart, so adds can be upserts; also serves
+    # user_id lookups
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'product_id', name='uq_shopping_cart_user_product'),
+    )
     if environment == "production":
-        __table_args__ = {'schema': SCHEMA}
+        __table_args__ = __table_args__ + ({'schema': SCHEMA},)
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod("users.id")), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod("products.id")), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod("products.id")), nullable=False, index=True)
     quantity = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -1,9 +1,23 @@
 from .db import db, environment, SCHEMA, add_prefix_for_prod
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS
+from app.hashing import hashing_pool
+from flask import current_app
 from flask_login import UserMixin
 from datetime import datetime
 
 
+def password_hash_method():
+    """
+    The configured werkzeug hash method, written out the way werkzeug
+    stores it in the hash (pbkdf2 without an explicit iteration count means
+    werkzeug's default).
+    """
+    method = current_app.config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+    if method.startswith('pbkdf2:') and method.count(':') == 1:
+        method = f'{method}:{DEFAULT_PBKDF2_ITERATIONS}'
+    return method
+
+
 class User(db.Model, UserMixin):
     __tablename__ = 'users'
 
@@ -32,10 +46,19 @@ class User(db.Model, UserMixin):
 
     @password.setter
     def password(self, password):
-        self.hashed_password = generate_password_hash(password)
+        # may raise HashingBusy when too many hashes are already in flight
+        self.hashed_password = hashing_pool.generate(
+            password,
+            password_hash_method(),
+            current_app.config.get('PASSWORD_SALT_LENGTH', 16)
+        )
 
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        return hashing_pool.check(self.password, password)
+
+    def needs_rehash(self):
+        # hashes look like "<method>$<salt>$<hash>"
+        return self.hashed_password.split('$', 1)[0] != password_hash_method()
 
     def to_dict(self):
         return {
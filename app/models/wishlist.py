@@ -6,12 +6,16 @@ from werkzeug.security import generate_password_hash, check_password_hash
 class Wishlist(db.Model):
     __tablename__ = 'wish_list'
 
+    # one row per product per user; also serves user_id lookups
+    __table_args__ = (
+        db.Index('uq_wish_list_user_product', 'user_id', 'product_id', unique=True),
+    )
     if environment == "production":
-        __table_args__ = {'schema': SCHEMA}
+        __table_args__ = __table_args__ + ({'schema': SCHEMA},)
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod("users.id")), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod("products.id")), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod("products.id")), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     user = db.relationship("User", back_populates="wish_list_items")
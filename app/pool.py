@@ -0,0 +1,156 @@
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.metrics import Histogram, LATENCY_BUCKETS
+from app.models import db
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that keeps its own counters: how long each checkout took (the
+    wait for a free connection plus any connect or pre-ping), checkout
+    timeouts, new connections and connections invalidated as stale.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait = Histogram(LATENCY_BUCKETS)
+        event.listen(self, 'connect', self._connected)
+        event.listen(self, 'invalidate', self._invalidated)
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        with self._stats_lock:
+            self.wait.observe(('pool',), time.perf_counter() - started)
+        return connection
+
+    def _connected(self, dbapi_connection, connection_record):
+        with self._stats_lock:
+            self.connects += 1
+
+    def _invalidated(self, dbapi_connection, connection_record, exception):
+        with self._stats_lock:
+            self.invalidations += 1
+
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    """
+    TimedQueuePool for the asyncio engine in app/asgi.py.
+    """
+
+
+class PoolMonitor:
+    """
+    Configures the SQLAlchemy connection pool from DB_POOL_* settings and
+    exports its state for /api/metrics: connections in use and idle,
+    overflow, checkout wait times, timeouts and reconnects.
+
+    Every gunicorn worker has its own pool, so the worst case number of
+    Postgres connections is workers * (DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW).
+    Must be initialized before db.init_app, which creates the engines.
+    """
+
+    def __init__(self, app=None):
+        self.extra_engines = {}
+        if app is not None:
+            self.init_app(app)
+
+    def engine_options(self, app, url, poolclass=TimedQueuePool):
+        """
+        Pool keyword arguments for an engine on `url`, from DB_POOL_*.
+        """
+        options = {
+            'pool_pre_ping': app.config.get('DB_POOL_PRE_PING', True),
+            'pool_recycle': app.config.get('DB_POOL_RECYCLE', 1800),
+        }
+        # sqlite (development) keeps its own pool; the sizing options only
+        # apply to a queue pool
+        if make_url(url).get_backend_name() != 'sqlite':
+            options.update(
+                poolclass=poolclass,
+                pool_size=app.config.get('DB_POOL_SIZE', 5),
+                max_overflow=app.config.get('DB_POOL_MAX_OVERFLOW', 10),
+                pool_timeout=app.config.get('DB_POOL_TIMEOUT', 30),
+            )
+        return options
+
+    def watch(self, name, engine):
+        """
+        Reports an engine created outside Flask-SQLAlchemy under `name`.
+        """
+        self.extra_engines[name] = engine
+
+    def engines(self):
+        engines = {key or 'default': engine for key, engine in db.engines.items()}
+        engines.update(self.extra_engines)
+        return engines
+
+    def init_app(self, app):
+        options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+        for name, value in self.engine_options(app, app.config['SQLALCHEMY_DATABASE_URI']).items():
+            options.setdefault(name, value)
+        app.extensions['pool_monitor'] = self
+
+    def stats(self):
+        """
+        Pool state per bind ('default' is the main database, 'async' the
+        asyncio engine when serving through app/asgi.py).
+        """
+        pools = {}
+        for name, engine in self.engines().items():
+            pool = engine.pool
+            stats = {'pool': type(pool).__name__}
+            if isinstance(pool, QueuePool):
+                stats.update(size=pool.size(), in_use=pool.checkedout(), idle=pool.checkedin(),
+                             overflow=max(pool.overflow(), 0), max_overflow=pool._max_overflow)
+            if isinstance(pool, TimedQueuePool):
+                with pool._stats_lock:
+                    stats.update(connects=pool.connects, invalidations=pool.invalidations,
+                                 timeouts=pool.timeouts)
+            pools[name] = stats
+        return pools
+
+    def metric_lines(self):
+        # gauges and counters in the Prometheus text format, for /api/metrics
+        pools = self.stats()
+        lines = []
+        for field, kind in (('size', 'gauge'), ('in_use', 'gauge'), ('idle', 'gauge'),
+                            ('overflow', 'gauge'), ('connects', 'counter'),
+                            ('invalidations', 'counter'), ('timeouts', 'counter')):
+            metric = f'db_pool_{field}_total' if kind == 'counter' else f'db_pool_{field}'
+            values = [(bind, stats[field]) for bind, stats in pools.items() if field in stats]
+            if values:
+                lines.append(f'# TYPE {metric} {kind}')
+                lines += [f'{metric}{{bind="{bind}"}} {value}' for bind, value in values]
+
+        name = 'db_pool_checkout_seconds'
+        timed = [(name, engine.pool) for name, engine in self.engines().items()
+                 if isinstance(engine.pool, TimedQueuePool)]
+        if timed:
+            lines.append(f'# TYPE {name} histogram')
+        for bind, pool in timed:
+            with pool._stats_lock:
+                for _, (counts, total, count) in pool.wait.series.items():
+                    for bound, bucket_count in zip(pool.wait.buckets, counts):
+                        lines.append(f'{name}_bucket{{bind="{bind}",le="{bound}"}} {bucket_count}')
+                    lines.append(f'{name}_bucket{{bind="{bind}",le="+Inf"}} {count}')
+                    lines.append(f'{name}_sum{{bind="{bind}"}} {total:.6f}')
+                    lines.append(f'{name}_count{{bind="{bind}"}} {count}')
+        return lines
+
+
+pool_monitor = PoolMonitor()
@@ -0,0 +1,166 @@
+import threading
+import time
+
+from flask import g, has_app_context, has_request_context, request, session
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models import db
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class ReplicaRouter:
+    """
+    Optional read replicas. Each URL in DATABASE_REPLICA_URLS becomes a
+    `replica_<n>` bind; GET/HEAD requests pick one round-robin and their
+    SELECTs run there (RoutingSession in app/models/db.py), while writes
+    and every other method stay on the primary.
+
+    A replica that fails a health check, or whose connection breaks
+    mid-query, is skipped for REPLICA_RETRY_AFTER seconds. A browser whose
+    request wrote anything reads from the primary for the next
+    REPLICA_STICKY_SECONDS, so it sees its own changes despite replication
+    lag, and doesn't get response cache hits (app/cache.py) during that time
+    either. Must be initialized before db.init_app, which creates the engines.
+    """
+
+    def __init__(self, app=None):
+        self.keys = []
+        self.sticky_seconds = 5
+        self.retry_after = 30
+        self.check_interval = 10
+        self._lock = threading.Lock()
+        self._next = 0
+        self._down_until = {}
+        self._checked_at = {}
+        self.reads = {}
+        self.failures = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        urls = app.config.get('DATABASE_REPLICA_URLS') or []
+        self.sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', 5)
+        self.retry_after = app.config.get('REPLICA_RETRY_AFTER', 30)
+        self.check_interval = app.config.get('REPLICA_CHECK_INTERVAL', 10)
+        binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+        self.keys = []
+        for n, url in enumerate(urls):
+            key = f'replica_{n}'
+            binds[key] = url
+            self.keys.append(key)
+            self.reads[key] = 0
+            self.failures[key] = 0
+        app.extensions['replica_router'] = self
+
+        # registered even without replicas, so one can be attached later
+        # (tests/test_replica_stickiness.py); without any they return straight away
+        app.before_request(self._route_request)
+        app.after_request(self._remember_writes)
+        # a replica whose connection breaks mid-request is taken out too
+        event.listen(Engine, 'handle_error', self._connection_failed)
+
+    def _route_request(self):
+        g.db_replica = None
+        if not self.keys or request.method not in SAFE_METHODS:
+            return
+        if session.get('db_primary_until', 0) > time.time():
+            # other browsers may have refilled the response cache from a
+            # replica that hasn't caught up with this one's write yet
+            g.skip_cached_responses = True
+            return
+        g.db_replica = self.choose()
+
+    def _remember_writes(self, response):
+        if not self.keys:
+            return response
+        wrote = request.method not in SAFE_METHODS and response.status_code < 400
+        if wrote or g.get('db_wrote'):
+            session['db_primary_until'] = int(time.time() + self.sticky_seconds) + 1
+        return response
+
+    def choose(self):
+        """
+        The next healthy replica engine, or None to read from the primary.
+        """
+        engines = db.engines
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.keys)
+        for i in range(len(self.keys)):
+            key = self.keys[(start + i) % len(self.keys)]
+            if self._healthy(key, engines[key]):
+                with self._lock:
+                    self.reads[key] += 1
+                return engines[key]
+        return None
+
+    def _healthy(self, key, engine):
+        now = time.time()
+        with self._lock:
+            if self._down_until.get(key, 0) > now:
+                return False
+            if now - self._checked_at.get(key, 0) < self.check_interval:
+                return True
+            self._checked_at[key] = now
+        try:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+        except Exception:
+            self.mark_down(key)
+            return False
+        return True
+
+    def mark_down(self, key):
+        now = time.time()
+        with self._lock:
+            if self._down_until.get(key, 0) > now:
+                return
+            self._down_until[key] = now + self.retry_after
+            self._checked_at[key] = 0
+            self.failures[key] += 1
+
+    def _connection_failed(self, context):
+        if not (context.is_disconnect or context.connection is None) or not has_app_context():
+            return
+        for key in self.keys:
+            if db.engines[key] is context.engine:
+                self.mark_down(key)
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return {
+                key: {
+                    'healthy': self._down_until.get(key, 0) <= now,
+                    'reads': self.reads[key],
+                    'failures': self.failures[key],
+                } for key in self.keys
+            }
+
+    def metric_lines(self):
+        # gauges and counters in the Prometheus text format, for /api/metrics
+        stats = self.stats()
+        if not stats:
+            return []
+        lines = []
+        for field, metric, kind in (('healthy', 'db_replica_healthy', 'gauge'),
+                                    ('reads', 'db_replica_requests_total', 'counter'),
+                                    ('failures', 'db_replica_failures_total', 'counter')):
+            lines.append(f'# TYPE {metric} {kind}')
+            lines += [f'{metric}{{bind="{key}"}} {int(replica[field])}' for key, replica in stats.items()]
+        return lines
+
+
+replica_router = ReplicaRouter()
+
+
+# A write in the middle of a read-only request sends the rest of its reads,
+# and that browser's next ones, to the primary
+@event.listens_for(Session, 'after_flush')
+def note_write(orm_session, flush_context):
+    if has_request_context():
+        g.db_wrote = True
+        g.db_replica = None
@@ -0,0 +1,193 @@
+import math
+import re
+import threading
+from collections import defaultdict
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session, object_session
+
+from app.models import db, Product
+
+# Postgres keeps products.search_vector current and serves queries from its
+# GIN index. Everywhere else (sqlite in development) an in-process inverted
+# index stands in, fed by the same ORM write paths.
+
+TITLE_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in',
+    'is', 'it', 'of', 'on', 'or', 'the', 'to', 'with',
+}
+
+
+def tokenize(text):
+    return [token for token in re.findall(r'[a-z0-9]+', (text or '').lower()) if token not in STOPWORDS]
+
+
+def search_vector_expression(title, description):
+    # title matches rank above description matches
+    return func.setweight(func.to_tsvector('english', func.coalesce(title, '')), 'A') \
+        .op('||')(func.setweight(func.to_tsvector('english', func.coalesce(description, '')), 'B'))
+
+
+class InvertedIndex:
+    """
+    token -> {product_id: weighted term frequency}, ranked with tf-idf.
+    Multi-word queries match products containing every word.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        self._lock = threading.Lock()
+        self.built = False
+
+    def build(self, rows):
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            for product_id, title, description in rows:
+                self._add(product_id, title, description)
+            self.built = True
+
+    def _add(self, product_id, title, description):
+        weights = defaultdict(float)
+        for token in tokenize(title):
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(description):
+            weights[token] += DESCRIPTION_WEIGHT
+        for token, weight in weights.items():
+            self._postings[token][product_id] = weight
+        self._documents[product_id] = set(weights)
+
+    def _remove(self, product_id):
+        for token in self._documents.pop(product_id, ()):
+            postings = self._postings[token]
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[token]
+
+    def update(self, product_id, title, description):
+        with self._lock:
+            self._remove(product_id)
+            self._add(product_id, title, description)
+
+    def remove(self, product_id):
+        with self._lock:
+            self._remove(product_id)
+
+    def search(self, query, limit, offset=0):
+        """
+        Returns up to `limit` product ids, best match first.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in terms]
+            if not all(postings):
+                return []
+            total = len(self._documents)
+            # intersect starting from the rarest term
+            postings.sort(key=len)
+            matches = set(postings[0]).intersection(*postings[1:])
+            scores = {
+                product_id: sum(
+                    (1 + math.log(posting[product_id])) * math.log(1 + total / len(posting))
+                    for posting in postings
+                )
+                for product_id in matches
+            }
+        ranked = sorted(scores, key=lambda product_id: (-scores[product_id], -product_id))
+        return ranked[offset:offset + limit]
+
+
+index = InvertedIndex()
+
+
+def using_postgres():
+    return db.session.get_bind().dialect.name == 'postgresql'
+
+
+def search_products(query, limit, offset=0):
+    """
+    Ranked products matching `query`, `limit` at a time.
+    """
+    if using_postgres():
+        ts_query = func.plainto_tsquery('english', query)
+        return Product.listing_query() \
+            .filter(Product.search_vector.op('@@')(ts_query)) \
+            .order_by(func.ts_rank_cd(Product.search_vector, ts_query).desc(), Product.id.desc()) \
+            .offset(offset) \
+            .limit(limit) \
+            .all()
+
+    if not index.built:
+        index.build(db.session.query(Product.id, Product.title, Product.description))
+    ids = index.search(query, limit, offset)
+    if not ids:
+        return []
+    products = {product.id: product for product in Product.listing_query().filter(Product.id.in_(ids))}
+    return [products[product_id] for product_id in ids if product_id in products]
+
+
+def reindex_products(ids=None):
+    """
+    Catches the index up after bulk loads that bypass the ORM events,
+    optionally only for the given product ids.
+    """
+    if using_postgres():
+        missing = Product.search_vector.is_(None) if ids is None else Product.id.in_(ids)
+        db.session.execute(
+            db.update(Product)
+            .where(missing)
+            # the vector isn't part of any response, so keep updated_at (and
+            # with it every ETag) as it was
+            .values(search_vector=search_vector_expression(Product.title, Product.description),
+                    updated_at=Product.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+    elif ids is None:
+        # rebuilt from the table on the next search
+        index.built = False
+
+
+@event.listens_for(Product, 'before_insert')
+@event.listens_for(Product, 'before_update')
+def refresh_search_vector(mapper, connection, target):
+    if connection.dialect.name == 'postgresql':
+        target.search_vector = search_vector_expression(target.title, target.description)
+
+
+# The in-process index only changes once the transaction commits, so a
+# rolled back write never shows up in search results.
+
+def _pending(session):
+    return session.info.setdefault('search_index_pending', {})
+
+
+@event.listens_for(Product, 'after_insert')
+@event.listens_for(Product, 'after_update')
+def queue_index_update(mapper, connection, target):
+    if connection.dialect.name != 'postgresql':
+        _pending(object_session(target))[target.id] = (target.title, target.description)
+
+
+@event.listens_for(Product, 'after_delete')
+def queue_index_removal(mapper, connection, target):
+    if connection.dialect.name != 'postgresql':
+        _pending(object_session(target))[target.id] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_index_updates(session):
+    for product_id, fields in session.info.pop('search_index_pending', {}).items():
+        if fields is None:
+            index.remove(product_id)
+        else:
+            index.update(product_id, *fields)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_index_updates(session):
+    session.info.pop('search_index_pending', None)
@@ -1,8 +1,12 @@
+import time
+
+import click
 from flask.cli import AppGroup
 from .users import seed_users, undo_users
 from .products import seed_products, undo_products
 from app.seeds.wishlists import seed_wishlists, undo_wishlists
 from .reviews import seed_reviews, undo_reviews
+from .synthetic import seed_synthetic
 
 from app.models.db import db, environment, SCHEMA
 
@@ -34,3 +38,55 @@ def undo():
     undo_products()
     undo_reviews()
     undo_users()
+
+
+def progress_printer(totals):
+    """
+    Progress callback for seed_synthetic that prints each table's row count
+    and insert rate about once a second, and when the table is done.
+    """
+    state = {'table': None, 'started': time.perf_counter(), 'finished': None, 'printed': 0}
+
+    def progress(table, inserted):
+        now = time.perf_counter()
+        if table != state['table']:
+            # tables are loaded one after another
+            state.update(table=table, started=state['finished'] or state['started'], printed=0)
+        state['finished'] = now
+        total = totals[table]
+        if inserted < total and now - state['printed'] < 1:
+            return
+        state['printed'] = now
+        rate = inserted / max(now - state['started'], 1e-6)
+        click.echo(f'  {table}: {inserted:,}/{total:,} rows ({inserted * 100 // total}%), {rate:,.0f} rows/s')
+
+    return progress
+
+
+# Creates the `flask seed synthetic` command, for load testing datasets, e.g.
+#   flask seed synthetic --users 100000 --products 1000000 --reviews 5000000
+@seed_commands.command('synthetic')
+@click.option('--users', default=1000, show_default=True)
+@click.option('--products', default=10000, show_default=True)
+@click.option('--reviews', default=50000, show_default=True)
+@click.option('--wishlists', default=10000, show_default=True)
+@click.option('--seed', default=0, show_default=True, help='Same seed and starting database, same data.')
+@click.option('--chunk-size', default=10000, show_default=True, help='Rows per INSERT or COPY.')
+def synthetic(users, products, reviews, wishlists, seed, chunk_size):
+    if environment == 'production':
+        raise click.UsageError('Refusing to load synthetic data into the production database.')
+    if users < 1 and (products or reviews or wishlists):
+        raise click.UsageError('Products, reviews and wishlists need at least one user.')
+    if products < 1 and (reviews or wishlists):
+        raise click.UsageError('Reviews and wishlists need at least one product.')
+    if wishlists > users * products:
+        raise click.UsageError('Wishlists can be at most users x products; each pair is wishlisted once.')
+
+    totals = {'users': users, 'products': products, 'reviews': reviews, 'wish_list': wishlists}
+    click.echo(f'Seeding {users:,} users, {products:,} products, {reviews:,} reviews, '
+               f'{wishlists:,} wishlist rows (seed {seed})...')
+    started = time.perf_counter()
+    user_ids, product_ids = seed_synthetic(users, products, reviews, wishlists, seed=seed,
+                                           chunk_size=chunk_size, progress=progress_printer(totals))
+    click.echo(f'Done in {time.perf_counter() - started:.1f}s: users {user_ids.start}-{user_ids.stop - 1}, '
+               f'products {product_ids.start}-{product_ids.stop - 1}.')
@@ -1,4 +1,4 @@
-from app.models import db, Review
+from app.models import db, Review, Product
 from datetime import datetime
 from random import randint, choice
 from app.models.db import environment
@@ -33,6 +33,8 @@ def seed_reviews():
     )
 
     db.session.add_all([review1, review2, review3])
+    for review in (review1, review2, review3):
+        Product.record_rating_change(review.product_id, added=review.rating)
     db.session.commit()
 
 def undo_reviews():
@@ -0,0 +1,196 @@
+import csv
+import io
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from werkzeug.security import generate_password_hash
+
+from app.models import db, User, Product, Review, Wishlist
+from app.models.user import password_hash_method
+from app.search import reindex_products
+
+# Deterministic fake data for load and benchmark runs. Rows go in chunks,
+# never through ORM objects: COPY on postgres (psycopg2), Core executemany
+# INSERTs elsewhere.
+
+WORDS = [
+    'ambient', 'analog', 'aurora', 'bass', 'beats', 'chill', 'chrome', 'city',
+    'cosmic', 'dawn', 'deep', 'disco', 'dream', 'drift', 'dub', 'echo',
+    'electric', 'ember', 'fuzz', 'glass', 'groove', 'haze', 'house', 'jazz',
+    'lofi', 'lunar', 'midnight', 'mirage', 'neon', 'night', 'noise', 'ocean',
+    'orbit', 'pulse', 'rain', 'retro', 'rhythm', 'signal', 'soul', 'static',
+    'summer', 'sunset', 'synth', 'tape', 'techno', 'tide', 'velvet', 'vinyl',
+    'wave', 'winter',
+]
+FORMATS = ['EP', 'LP', 'Single', 'Mixtape', 'Sessions', 'Live', 'Remixes']
+
+SYNTHETIC_PASSWORD = 'password'
+# every timestamp is this plus a seeded offset, never the wall clock
+EPOCH = datetime(2024, 1, 1)
+TIMESTAMP_SPAN = 365 * 24 * 3600
+USERNAME_PREFIX = 'synthetic_'
+REVIEW_TEXT_POOL = 4096
+
+
+def copy_rows(model, chunk):
+    """
+    Writes a chunk of row dicts with postgres COPY, on the session's
+    connection so it's part of the same transaction.
+    """
+    connection = db.session.connection()
+    preparer = connection.dialect.identifier_preparer
+    columns = list(chunk[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # an unquoted empty field is NULL in COPY's csv format
+    writer.writerows([
+        ['' if row[column] is None else row[column] for column in columns]
+        for row in chunk
+    ])
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {preparer.format_table(model.__table__)} "
+            f"({', '.join(preparer.quote(column) for column in columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def insert_rows(model, chunk):
+    db.session.execute(db.insert(model), chunk)
+
+
+def chunk_writer():
+    bind = db.session.get_bind()
+    if bind.dialect.name == 'postgresql' and bind.dialect.driver == 'psycopg2':
+        return copy_rows
+    return insert_rows
+
+
+def insert_chunked(model, rows, chunk_size, progress=None):
+    """
+    Writes an iterable of row dicts `chunk_size` rows at a time.
+    """
+    write = chunk_writer()
+    chunk = []
+    inserted = 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            write(model, chunk)
+            inserted += len(chunk)
+            chunk = []
+            if progress:
+                progress(model.__tablename__, inserted)
+    if chunk:
+        write(model, chunk)
+        inserted += len(chunk)
+        if progress:
+            progress(model.__tablename__, inserted)
+    return inserted
+
+
+def next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def sync_sequences(*models):
+    # explicit ids leave postgres sequences behind the data
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    for model in models:
+        table = model.__table__
+        name = f'{table.schema}.{table.name}' if table.schema else table.name
+        db.session.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {name}))"
+        ))
+
+
+def seed_synthetic(users, products, reviews, wishlists, seed=0, chunk_size=1000, progress=None):
+    """
+    Adds the requested number of synthetic rows on top of whatever is in
+    the database. The same arguments always produce the same data.
+    Returns the (first, last) user and product ids created.
+    """
+    if wishlists > users * products:
+        # wishlist rows are unique per (user, product)
+        raise ValueError(f'At most users x products = {users * products} wishlist rows.')
+    rng = random.Random(seed)
+    # one hash for every synthetic user; hashing per row would dominate
+    hashed_password = generate_password_hash(SYNTHETIC_PASSWORD, method=password_hash_method())
+
+    def timestamp():
+        return EPOCH + timedelta(seconds=rng.randrange(TIMESTAMP_SPAN))
+
+    first_user = next_id(User)
+    user_ids = range(first_user, first_user + users)
+    insert_chunked(User, ({
+        'id': user_id,
+        'username': f'{USERNAME_PREFIX}{user_id}',
+        'email': f'{USERNAME_PREFIX}{user_id}@example.com',
+        'hashed_password': hashed_password,
+        'first_name': rng.choice(WORDS).title(),
+        'last_name': rng.choice(WORDS).title(),
+        'created_at': EPOCH,
+        'updated_at': EPOCH,
+    } for user_id in user_ids), chunk_size, progress)
+
+    def product_row(product_id):
+        words = rng.sample(WORDS, 3)
+        created_at = timestamp()
+        return {
+            'id': product_id,
+            'seller_id': rng.choice(user_ids),
+            'title': f"{words[0].title()} {words[1].title()} {rng.choice(FORMATS)}",
+            'description': ' '.join(rng.choices(WORDS, k=12)),
+            'price': round(rng.uniform(0.99, 49.99), 2),
+            'cover_image_url': f'https://via.placeholder.com/300x300.png?text={product_id}',
+            'created_at': created_at,
+            'updated_at': created_at,
+        }
+
+    first_product = next_id(Product)
+    product_ids = range(first_product, first_product + products)
+    insert_chunked(Product, (product_row(product_id) for product_id in product_ids), chunk_size, progress)
+
+    # reviews draw their text from a fixed pool; building 20 random words
+    # per row would take longer than writing millions of them
+    titles = [f"{rng.choice(WORDS).title()} {rng.choice(WORDS)}" for _ in range(REVIEW_TEXT_POOL)]
+    contents = [' '.join(rng.choices(WORDS, k=20)) for _ in range(REVIEW_TEXT_POOL)]
+    def review_row():
+        created_at = timestamp()
+        return {
+            'user_id': rng.choice(user_ids),
+            'product_id': rng.choice(product_ids),
+            'rating': rng.randint(1, 5),
+            'title': rng.choice(titles),
+            'content': rng.choice(contents),
+            'created_at': created_at,
+            'updated_at': created_at,
+        }
+
+    insert_chunked(Review, (review_row() for _ in range(reviews)), chunk_size, progress)
+
+    # distinct (user, product) pairs, drawn without replacement as indexes
+    # into the users x products grid
+    def wishlist_pairs():
+        for pair in rng.sample(range(users * products), wishlists):
+            yield {
+                'user_id': user_ids[pair // products],
+                'product_id': product_ids[pair % products],
+                'created_at': timestamp(),
+            }
+
+    insert_chunked(Wishlist, wishlist_pairs(), chunk_size, progress)
+
+    sync_sequences(User, Product)
+    if reviews:
+        Product.rebuild_rating_aggregates(touch=False)
+    reindex_products()
+    db.session.commit()
+    return user_ids, product_ids
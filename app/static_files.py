@@ -0,0 +1,116 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+import click
+from flask import Response, current_app, request, send_from_directory
+from flask.cli import AppGroup
+from werkzeug.security import safe_join
+
+# Vite names built assets like assets/index-9ad8158c.js; a new build means
+# a new name, so those files can be cached forever
+FINGERPRINTED = re.compile(r'^assets/.+-[\w-]{8,}\.\w+$')
+ONE_YEAR = 365 * 24 * 3600
+SHORT_LIVED = 3600
+
+# Content-Encoding -> suffix of the prebuilt sibling file, best first
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+COMPRESSIBLE = ('.js', '.css', '.html', '.svg', '.json', '.txt', '.map')
+
+
+def serve_static(filename):
+    """
+    Replaces Flask's static view for the Vite build: serves a .br/.gz
+    sibling when the client accepts it, marks fingerprinted assets
+    immutable for a year and everything else short-lived.
+    """
+    if filename == 'index.html':
+        return index_page.response()
+
+    folder = current_app.static_folder
+    response = None
+    for encoding, suffix in PRECOMPRESSED:
+        path = safe_join(folder, filename + suffix)
+        if request.accept_encodings[encoding] and path is not None and os.path.isfile(path):
+            response = send_from_directory(
+                folder, filename + suffix,
+                mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            )
+            response.content_encoding = encoding
+            break
+    if response is None:
+        response = send_from_directory(folder, filename)
+
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    if FINGERPRINTED.match(filename):
+        response.cache_control.max_age = ONE_YEAR
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.max_age = SHORT_LIVED
+    return response
+
+
+class IndexPage:
+    """
+    index.html held in memory; it's the answer to every client-side route
+    and 404, so it shouldn't cost a disk read each time. In debug mode the
+    file is re-read when its mtime changes (vite build --watch).
+    """
+
+    def __init__(self):
+        self.body = None
+        self.etag = None
+        self.mtime = None
+
+    def response(self):
+        path = os.path.join(current_app.static_folder, 'index.html')
+        if self.body is None or current_app.debug:
+            mtime = os.path.getmtime(path)
+            if mtime != self.mtime:
+                with open(path, 'rb') as f:
+                    self.body = f.read()
+                self.etag = hashlib.sha1(self.body).hexdigest()
+                self.mtime = mtime
+
+        response = Response(self.body, mimetype='text/html')
+        # always revalidate, so a deploy's new bundle names are picked up at once
+        response.cache_control.no_cache = True
+        response.set_etag(self.etag)
+        return response.make_conditional(request)
+
+
+index_page = IndexPage()
+
+
+# Creates an assets group to hold our commands
+# So we can type `flask assets --help`
+assets_commands = AppGroup('assets')
+
+
+# Creates the `flask assets compress` command; run it after `npm run build`
+@assets_commands.command('compress')
+def compress():
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        click.echo('brotli is not installed; writing .gz files only.')
+
+    folder = current_app.static_folder
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            with open(path + '.gz', 'wb') as f:
+                f.write(gzip.compress(data, compresslevel=9))
+            if brotli is not None:
+                with open(path + '.br', 'wb') as f:
+                    f.write(brotli.compress(data))
+            click.echo(os.path.relpath(path, folder))
@@ -38,6 +38,12 @@ target_metadata = current_app.extensions['migrate'].db.metadata
 # ... etc.
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # created by a postgres-only DDL hook rather than declared on the model
+    # (app/models/product.py)
+    return not (type_ == 'index' and name == 'ix_products_search_vector')
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -88,6 +94,7 @@ def run_migrations_online():
             connection=connection,
             target_metadata=target_metadata,
             process_revision_directives=process_revision_directives,
+            include_object=include_object,
             **current_app.extensions['migrate'].configure_args
         )
         # Create a schema (only in production)
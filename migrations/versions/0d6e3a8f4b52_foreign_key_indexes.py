@@ -0,0 +1,60 @@
+"""Foreign key indexes
+
+Revision ID: 0d6e3a8f4b52
+Revises: f5b81d0c6a29
+Create Date: 2026-10-18 13:58:12.906114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import os
+environment = os.getenv("FLASK_ENV")
+SCHEMA = os.environ.get("SCHEMA")
+
+# revision identifiers, used by Alembic.
+revision = '0d6e3a8f4b52'
+down_revision = 'f5b81d0c6a29'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, unique)
+# wish_list.user_id and shopping_cart.user_id lookups are served by the
+# leading column of their (user_id, product_id) unique indexes
+INDEXES = [
+    ('ix_products_seller_id', 'products', ['seller_id'], False),
+    ('ix_reviews_product_id', 'reviews', ['product_id'], False),
+    ('ix_reviews_user_id', 'reviews', ['user_id'], False),
+    ('ix_wish_list_product_id', 'wish_list', ['product_id'], False),
+    ('uq_wish_list_user_product', 'wish_list', ['user_id', 'product_id'], True),
+    ('ix_shopping_cart_product_id', 'shopping_cart', ['product_id'], False),
+]
+
+
+def upgrade():
+    schema = SCHEMA if environment == "production" else None
+    prefix = f"{SCHEMA}." if schema else ""
+    postgres = op.get_bind().dialect.name == 'postgresql'
+
+    # drop duplicate wishlist rows so the unique index can be built
+    op.execute(f"""
+        DELETE FROM {prefix}wish_list WHERE id NOT IN (
+            SELECT MIN(id) FROM {prefix}wish_list GROUP BY user_id, product_id
+        )
+    """)
+
+    for name, table, columns, unique in INDEXES:
+        if postgres:
+            # CONCURRENTLY can't run inside the migration transaction, but
+            # it doesn't lock the table against writes while it builds
+            with op.get_context().autocommit_block():
+                op.create_index(name, table, columns, unique=unique, schema=schema,
+                                postgresql_concurrently=True)
+        else:
+            op.create_index(name, table, columns, unique=unique, schema=schema)
+
+
+def downgrade():
+    schema = SCHEMA if environment == "production" else None
+    for name, table, columns, unique in reversed(INDEXES):
+        op.drop_index(name, table_name=table, schema=schema)
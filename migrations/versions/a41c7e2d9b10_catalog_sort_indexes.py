@@ -0,0 +1,31 @@
+"""Catalog sort indexes
+
+Revision ID: a41c7e2d9b10
+Revises: 3b04c32c1aaa
+Create Date: 2026-10-18 09:12:44.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import os
+environment = os.getenv("FLASK_ENV")
+SCHEMA = os.environ.get("SCHEMA")
+
+# revision identifiers, used by Alembic.
+revision = 'a41c7e2d9b10'
+down_revision = '3b04c32c1aaa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = SCHEMA if environment == "production" else None
+    op.create_index('ix_products_created_at_id', 'products', ['created_at', 'id'], schema=schema)
+    op.create_index('ix_products_price_id', 'products', ['price', 'id'], schema=schema)
+
+
+def downgrade():
+    schema = SCHEMA if environment == "production" else None
+    op.drop_index('ix_products_price_id', table_name='products', schema=schema)
+    op.drop_index('ix_products_created_at_id', table_name='products', schema=schema)
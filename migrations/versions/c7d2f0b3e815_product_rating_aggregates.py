@@ -0,0 +1,59 @@
+"""Product rating aggregates
+
+Revision ID: c7d2f0b3e815
+Revises: a41c7e2d9b10
+Create Date: 2026-10-18 10:03:27.551930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import os
+environment = os.getenv("FLASK_ENV")
+SCHEMA = os.environ.get("SCHEMA")
+
+# revision identifiers, used by Alembic.
+revision = 'c7d2f0b3e815'
+down_revision = 'a41c7e2d9b10'
+branch_labels = None
+depends_on = None
+
+COUNT_COLUMNS = ['review_count', 'rating_total'] + [f'rating_{rating}_count' for rating in range(1, 6)]
+
+
+def upgrade():
+    schema = SCHEMA if environment == "production" else None
+    with op.batch_alter_table('products', schema=schema) as batch_op:
+        for name in COUNT_COLUMNS:
+            batch_op.add_column(sa.Column(name, sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('average_rating', sa.Numeric(precision=3, scale=2), nullable=False, server_default='0'))
+
+    # One-time backfill from existing reviews; afterwards the API keeps
+    # these current incrementally.
+    prefix = f"{SCHEMA}." if schema else ""
+    histogram = ",\n            ".join(
+        f"rating_{rating}_count = (SELECT COUNT(*) FROM {prefix}reviews r "
+        f"WHERE r.product_id = {prefix}products.id AND r.rating = {rating})"
+        for rating in range(1, 6)
+    )
+    op.execute(f"""
+        UPDATE {prefix}products SET
+            review_count = (SELECT COUNT(*) FROM {prefix}reviews r WHERE r.product_id = {prefix}products.id),
+            rating_total = (SELECT COALESCE(SUM(r.rating), 0) FROM {prefix}reviews r WHERE r.product_id = {prefix}products.id),
+            {histogram}
+    """)
+    op.execute(f"""
+        UPDATE {prefix}products
+        SET average_rating = rating_total * 1.0 / review_count
+        WHERE review_count > 0
+    """)
+    op.create_index('ix_products_average_rating_id', 'products', ['average_rating', 'id'], schema=schema)
+
+
+def downgrade():
+    schema = SCHEMA if environment == "production" else None
+    op.drop_index('ix_products_average_rating_id', table_name='products', schema=schema)
+    with op.batch_alter_table('products', schema=schema) as batch_op:
+        batch_op.drop_column('average_rating')
+        for name in reversed(COUNT_COLUMNS):
+            batch_op.drop_column(name)
@@ -0,0 +1,48 @@
+"""Unique cart lines
+
+Revision ID: e2a9b6c4d371
+Revises: c7d2f0b3e815
+Create Date: 2026-10-18 11:26:05.104772
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import os
+environment = os.getenv("FLASK_ENV")
+SCHEMA = os.environ.get("SCHEMA")
+
+# revision identifiers, used by Alembic.
+revision = 'e2a9b6c4d371'
+down_revision = 'c7d2f0b3e815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = SCHEMA if environment == "production" else None
+    prefix = f"{SCHEMA}." if schema else ""
+    # fold any duplicate lines into the oldest one before enforcing uniqueness
+    op.execute(f"""
+        UPDATE {prefix}shopping_cart SET quantity = (
+            SELECT SUM(d.quantity) FROM {prefix}shopping_cart d
+            WHERE d.user_id = {prefix}shopping_cart.user_id
+              AND d.product_id = {prefix}shopping_cart.product_id
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM {prefix}shopping_cart GROUP BY user_id, product_id HAVING COUNT(*) > 1
+        )
+    """)
+    op.execute(f"""
+        DELETE FROM {prefix}shopping_cart WHERE id NOT IN (
+            SELECT MIN(id) FROM {prefix}shopping_cart GROUP BY user_id, product_id
+        )
+    """)
+    with op.batch_alter_table('shopping_cart', schema=schema) as batch_op:
+        batch_op.create_unique_constraint('uq_shopping_cart_user_product', ['user_id', 'product_id'])
+
+
+def downgrade():
+    schema = SCHEMA if environment == "production" else None
+    with op.batch_alter_table('shopping_cart', schema=schema) as batch_op:
+        batch_op.drop_constraint('uq_shopping_cart_user_product', type_='unique')
@@ -0,0 +1,48 @@
+"""Product search vector
+
+Revision ID: f5b81d0c6a29
+Revises: e2a9b6c4d371
+Create Date: 2026-10-18 12:40:51.782330
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+import os
+environment = os.getenv("FLASK_ENV")
+SCHEMA = os.environ.get("SCHEMA")
+
+# revision identifiers, used by Alembic.
+revision = 'f5b81d0c6a29'
+down_revision = 'e2a9b6c4d371'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = SCHEMA if environment == "production" else None
+    if op.get_bind().dialect.name != 'postgresql':
+        # sqlite searches an in-process index; the column only mirrors the
+        # model (always NULL there) and, like the model, gets no index
+        with op.batch_alter_table('products', schema=schema) as batch_op:
+            batch_op.add_column(sa.Column('search_vector', sa.Text(), nullable=True))
+        return
+
+    prefix = f"{SCHEMA}." if schema else ""
+    op.add_column('products', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True), schema=schema)
+    op.execute(f"""
+        UPDATE {prefix}products SET search_vector =
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    """)
+    op.create_index('ix_products_search_vector', 'products', ['search_vector'],
+                    schema=schema, postgresql_using='gin')
+
+
+def downgrade():
+    schema = SCHEMA if environment == "production" else None
+    with op.batch_alter_table('products', schema=schema) as batch_op:
+        if op.get_bind().dialect.name == 'postgresql':
+            batch_op.drop_index('ix_products_search_vector')
+        batch_op.drop_column('search_vector')
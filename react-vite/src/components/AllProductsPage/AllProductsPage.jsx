@@ -2,19 +2,27 @@ import { useEffect, useState } from "react";
 import ProductCard from "../ProductCard/ProductCard";
 import "./AllProductsPage.css"; // Optional for styles
 
+// The catalog comes one keyset page at a time; next_cursor fetches the next
+const fetchProductsPage = (cursor) => {
+  const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+  return fetch(`/api/products/${query}`).then((res) => {
+    if (!res.ok) throw new Error("Failed to fetch products.");
+    return res.json();
+  });
+};
+
 function AllProductsPage() {
   const [products, setProducts] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true); // ⏳ Loading state
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);     // ⚠️ Error state
 
   useEffect(() => {
-    fetch("/api/products")
-      .then((res) => {
-        if (!res.ok) throw new Error("Failed to fetch products.");
-        return res.json();
-      })
+    fetchProductsPage(null)
       .then((data) => {
-        setProducts(data);
+        setProducts(data.products);
+        setNextCursor(data.next_cursor);
         setLoading(false);
       })
       .catch((err) => {
@@ -23,6 +31,20 @@ function AllProductsPage() {
       });
   }, []);
 
+  const loadMore = () => {
+    setLoadingMore(true);
+    fetchProductsPage(nextCursor)
+      .then((data) => {
+        setProducts((current) => [...current, ...data.products]);
+        setNextCursor(data.next_cursor);
+        setLoadingMore(false);
+      })
+      .catch((err) => {
+        setError(err.message);
+        setLoadingMore(false);
+      });
+  };
+
   if (loading) return <p>Loading products...</p>;
   if (error) return <p>Error: {error}</p>;
   if (products.length === 0) return <p>No products available yet.</p>;
@@ -35,8 +57,13 @@ function AllProductsPage() {
           <ProductCard key={product.id} product={product} />
         ))}
       </div>
+      {nextCursor && (
+        <button className="load-more" onClick={loadMore} disabled={loadingMore}>
+          {loadingMore ? "Loading..." : "Load more"}
+        </button>
+      )}
     </div>
   );
 }
 
-export default AllProductsPage;
\ No newline at end of file
+export default AllProductsPage;
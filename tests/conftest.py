@@ -0,0 +1,57 @@
+import os
+import tempfile
+
+# app/config.py reads its settings when app is first imported, so the test
+# database has to be in place before that
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ.setdefault('SECRET_KEY', 'test')
+os.environ['CACHE_BACKEND'] = 'none'
+
+import pytest
+
+from app import app as flask_app
+from app.models import db, User, Product
+
+
+@pytest.fixture
+def app():
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        db.create_all(bind_key=None)
+        yield flask_app
+        db.session.remove()
+        db.drop_all(bind_key=None)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def add_users(count):
+    users = [
+        User(username=f'user{i}', email=f'user{i}@example.com', password='password',
+             first_name='Test', last_name='User')
+        for i in range(count)
+    ]
+    db.session.add_all(users)
+    db.session.commit()
+    return users
+
+
+def add_products(count, sellers):
+    products = [
+        Product(seller_id=sellers[i % len(sellers)].id, title=f'Product {i}',
+                description=f'Description {i}', price=i + 0.99)
+        for i in range(count)
+    ]
+    db.session.add_all(products)
+    db.session.commit()
+    return products
+
+
+def login(client, email='user0@example.com'):
+    client.get('/api/csrf/restore')
+    response = client.post('/api/auth/login', json={'email': email, 'password': 'password'})
+    assert response.status_code == 200
+    return response
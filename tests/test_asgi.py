@@ -0,0 +1,147 @@
+import asyncio
+import time
+
+import pytest
+
+from app.asgi import application
+from app.cache import LocalCacheBackend, cache
+from app.models import db, Wishlist
+from conftest import add_products, add_users, login
+
+# headers that legitimately differ between two responses
+UNCOMPARED = {'date', 'set-cookie'}
+
+
+@pytest.fixture
+def shopper(app, client):
+    user, = add_users(1)
+    products = add_products(5, [user])
+    db.session.add_all([Wishlist(user_id=user.id, product_id=product.id) for product in products[:3]])
+    db.session.commit()
+    login(client, user.email)
+    return user
+
+
+@pytest.fixture
+def flask_fallbacks(monkeypatch):
+    """
+    Stands in for the Flask fallback; records the paths it was handed.
+    """
+    paths = []
+
+    async def wsgi(scope, receive, send):
+        paths.append(scope['path'])
+        await send({'type': 'http.response.start', 'status': 599, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    monkeypatch.setattr(application, 'wsgi', wsgi)
+    return paths
+
+
+@pytest.fixture
+def local_cache(app):
+    backend = cache.backend
+    cache.backend = LocalCacheBackend()
+    yield cache.backend
+    cache.backend = backend
+
+
+def cookie_header(client):
+    return '; '.join(f'{cookie.name}={cookie.value}' for cookie in client.cookie_jar)
+
+
+def asgi_get(url, headers=None):
+    path, _, query = url.partition('?')
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path, 'root_path': '', 'scheme': 'http',
+        'query_string': query.encode(), 'server': ('localhost', 80), 'client': ('127.0.0.1', 1),
+        'headers': [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        application.start()
+        try:
+            await application(scope, receive, send)
+        finally:
+            await application.engine.dispose()
+            application.engine = None
+
+    asyncio.run(run())
+    start, body = messages[0], b''.join(message.get('body', b'') for message in messages[1:])
+    return start['status'], {name.decode(): value.decode() for name, value in start['headers']}, body
+
+
+def flask_get(client, url, headers=None):
+    response = client.get(url, headers=headers)
+    return response.status_code, {name.lower(): value for name, value in response.headers.items()}, response.data
+
+
+@pytest.mark.parametrize('url', [
+    '/api/products/', '/api/products/?limit=2', '/api/products/1', '/api/products/?limit=0',
+    '/api/wishlist/', '/api/wishlist/?fields=ids', '/api/wishlist/?limit=2',
+])
+def test_native_responses_match_flask(client, shopper, flask_fallbacks, url):
+    headers = {'Cookie': cookie_header(client)}
+    status, response_headers, body = asgi_get(url, headers)
+    assert flask_fallbacks == []
+
+    expected_status, expected_headers, expected_body = flask_get(client, url)
+    assert (status, body) == (expected_status, expected_body)
+    for name in UNCOMPARED:
+        expected_headers.pop(name, None)
+    assert response_headers == expected_headers
+
+
+def test_native_catalog_shares_the_response_cache(client, shopper, flask_fallbacks, local_cache):
+    headers = {'Cookie': cookie_header(client)}
+    client.get('/api/products/?limit=2')
+    # planted under the key Flask used; only a cache hit returns it
+    key, = [key for key in local_cache._entries if 'catalog' in key]
+    local_cache.set(key, b'{"cached":true}\n', 60)
+
+    assert asgi_get('/api/products/?limit=2', headers)[2] == b'{"cached":true}\n'
+    assert asgi_get('/api/products/?limit=3', headers)[2] != b'{"cached":true}\n'
+    assert flask_fallbacks == []
+
+
+def test_native_catalog_skips_cache_reads_while_pinned_to_the_primary(app, client, shopper, flask_fallbacks,
+                                                                      local_cache):
+    with client.session_transaction() as browser_session:
+        browser_session['db_primary_until'] = int(time.time()) + 60
+    headers = {'Cookie': cookie_header(client)}
+    fresh = asgi_get('/api/products/', headers)[2]
+    key, = [key for key in local_cache._entries if 'catalog' in key]
+    local_cache.set(key, b'{"stale":true}\n', 60)
+
+    assert asgi_get('/api/products/', headers)[2] == fresh
+    assert local_cache.get(key) == fresh
+
+
+@pytest.mark.parametrize('extra', [
+    {'Origin': 'https://elsewhere.example'},
+    {'If-None-Match': '"anything"'},
+])
+def test_falls_back_to_flask_when_flask_would_answer_differently(client, shopper, flask_fallbacks, extra):
+    asgi_get('/api/products/', {'Cookie': cookie_header(client), **extra})
+    assert flask_fallbacks == ['/api/products/']
+
+
+def test_falls_back_to_flask_for_the_production_https_redirect(client, shopper, flask_fallbacks, monkeypatch):
+    monkeypatch.setenv('FLASK_ENV', 'production')
+    asgi_get('/api/products/', {'Cookie': cookie_header(client), 'X-Forwarded-Proto': 'http'})
+    assert flask_fallbacks == ['/api/products/']
+
+
+def test_falls_back_to_flask_to_issue_a_csrf_cookie(app, client, shopper, flask_fallbacks):
+    asgi_get('/api/products/')
+    with client.session_transaction() as browser_session:
+        browser_session['csrf_issued_at'] = int(time.time()) - app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    asgi_get('/api/products/', {'Cookie': cookie_header(client)})
+    assert flask_fallbacks == ['/api/products/', '/api/products/']
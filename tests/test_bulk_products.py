@@ -0,0 +1,63 @@
+import pytest
+
+from app.models import Product
+from conftest import add_users, login
+
+
+@pytest.fixture
+def seller(app, client):
+    user, = add_users(1)
+    login(client, user.email)
+    return user
+
+
+def test_mixed_payload_gets_a_result_per_item(client, seller):
+    response = client.post('/api/products/bulk', json={'products': [
+        {'title': 'Desk lamp', 'description': 'Brass', 'price': 10},
+        {'description': 'No title', 'price': 5},
+        'not an object',
+        {'title': 'Floor lamp', 'description': 'Tall', 'price': -1},
+        {'title': 'Reading chair', 'description': 'Oak', 'price': '120.50'},
+    ]})
+    assert response.status_code == 207
+    body = response.get_json()
+    assert body['counts'] == {'created': 2, 'error': 3}
+
+    results = body['results']
+    assert [result['index'] for result in results] == [0, 1, 2, 3, 4]
+    assert [result['status'] for result in results] == ['created', 'error', 'error', 'error', 'created']
+    assert results[1]['errors'] == {'title': ['Title is required.']}
+    assert results[2]['errors'] == {'item': 'Each item must be a JSON object.'}
+    assert list(results[3]['errors']) == ['price']
+    assert 'id' not in results[1]
+
+    created = {product.id: product for product in Product.query}
+    assert sorted(created) == sorted([results[0]['id'], results[4]['id']])
+    assert created[results[0]['id']].title == 'Desk lamp'
+    assert all(product.seller_id == seller.id for product in created.values())
+
+
+def test_malformed_ndjson_lines_get_their_own_result(client, seller):
+    body = '{"title": "Desk lamp", "description": "Brass", "price": 10}\n{"title": \n\n' \
+           '{"title": "Reading chair", "description": "Oak", "price": 120}\n'
+    response = client.post('/api/products/bulk', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 207
+    results = response.get_json()['results']
+    assert [(result['index'], result['status']) for result in results] == \
+        [(0, 'created'), (1, 'error'), (2, 'created')]
+    assert Product.query.count() == 2
+
+
+def test_all_valid_payload_is_a_plain_success(client, seller):
+    response = client.post('/api/products/bulk', json=[
+        {'title': f'Lamp {i}', 'description': 'Brass', 'price': i} for i in range(3)
+    ])
+    assert response.status_code == 200
+    assert response.get_json()['counts'] == {'created': 3}
+
+
+@pytest.mark.parametrize('payload', [[], {'products': 'lamp'}])
+def test_rejects_payloads_without_items(client, seller, payload):
+    response = client.post('/api/products/bulk', json=payload)
+    assert response.status_code == 400
+    assert list(response.get_json()['errors']) == ['products']
@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db, ShoppingCart
+from conftest import add_products, add_users, login
+
+
+@pytest.fixture
+def shopper(app, client):
+    user, = add_users(1)
+    # priced 0.99 and 1.99
+    products = add_products(2, [user])
+    login(client, user.email)
+    return user, [product.id for product in products]
+
+
+def test_adding_a_product_again_sums_into_one_line(client, shopper):
+    user, (product_id, _) = shopper
+    client.post(f'/api/cart/{product_id}', json={'quantity': 2})
+    summary = client.post(f'/api/cart/{product_id}', json={'quantity': 3}).get_json()
+
+    assert [(item['productId'], item['quantity']) for item in summary['items']] == [(product_id, 5)]
+    assert ShoppingCart.query.filter_by(user_id=user.id, product_id=product_id).count() == 1
+
+    # capped rather than rejected once the line is full
+    summary = client.post(f'/api/cart/{product_id}', json={'quantity': 99}).get_json()
+    assert summary['items'][0]['quantity'] == 99
+
+
+def test_merge_combines_repeated_and_existing_lines(client, shopper):
+    user, (first, second) = shopper
+    client.post(f'/api/cart/{first}', json={'quantity': 1})
+    summary = client.post('/api/cart/merge', json={'items': [
+        {'productId': first, 'quantity': 2}, {'productId': second}, {'productId': first, 'quantity': 1},
+    ]}).get_json()
+
+    assert {item['productId']: item['quantity'] for item in summary['items']} == {first: 4, second: 1}
+    assert ShoppingCart.query.filter_by(user_id=user.id).count() == 2
+
+
+def test_one_line_per_user_and_product(app, shopper):
+    user, (product_id, _) = shopper
+    db.session.add_all([ShoppingCart(user_id=user.id, product_id=product_id, quantity=1) for _ in range(2)])
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+
+
+def test_summary_totals(client, shopper):
+    _, (first, second) = shopper
+    client.post(f'/api/cart/{first}', json={'quantity': 2})
+    summary = client.post(f'/api/cart/{second}', json={'quantity': 3}).get_json()
+
+    assert [item['lineTotal'] for item in summary['items']] == [1.98, 5.97]
+    assert (summary['itemCount'], summary['total']) == (5, 7.95)
+
+    summary = client.put(f'/api/cart/{second}', json={'quantity': 0}).get_json()
+    assert (summary['itemCount'], summary['total']) == (2, 1.98)
+    assert client.delete(f'/api/cart/{first}').get_json() == {'items': [], 'itemCount': 0, 'total': 0.0}
+    assert client.get('/api/cart/').get_json()['total'] == 0.0
@@ -0,0 +1,63 @@
+import pytest
+
+from app.cache import LocalCacheBackend, cache
+from app.models import db, Product
+from conftest import add_products, add_users
+
+
+@pytest.fixture
+def local_cache(app):
+    cache.backend = LocalCacheBackend()
+    yield cache.backend
+    cache.backend = None
+
+
+def edit_elsewhere(product_id, title):
+    # a write handled by another worker: this worker's cache isn't invalidated
+    db.session.execute(db.update(Product).where(Product.id == product_id).values(title=title))
+    db.session.commit()
+
+
+@pytest.mark.parametrize('url', ['/api/products/1', '/api/products/'])
+def test_cached_body_matches_etag_after_write_elsewhere(client, local_cache, url):
+    add_products(3, add_users(1))
+    first = client.get(url)
+    assert client.get(url).get_data() == first.get_data()
+
+    edit_elsewhere(1, 'Renamed')
+    second = client.get(url)
+    assert second.status_code == 200
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert b'Renamed' in second.get_data()
+
+    revalidated = client.get(url, headers={'If-None-Match': second.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+def test_catalog_answers_conditional_gets(client, app):
+    add_products(3, add_users(1))
+    first = client.get('/api/products/')
+    assert client.get('/api/products/', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    edit_elsewhere(2, 'Renamed')
+    assert client.get('/api/products/', headers={'If-None-Match': first.headers['ETag']}).status_code == 200
+
+
+def test_catalog_etag_moves_when_a_product_is_deleted(client, app):
+    add_products(3, add_users(1))
+    first = client.get('/api/products/')
+    assert 'Last-Modified' not in first.headers
+
+    db.session.execute(db.delete(Product).where(Product.id == 2))
+    db.session.commit()
+    # with no Last-Modified to compare, If-Modified-Since alone never gets a 304
+    since = client.get('/api/products/', headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+    assert since.status_code == 200
+    assert client.get('/api/products/', headers={'If-None-Match': first.headers['ETag']}).status_code == 200
+
+
+def test_each_catalog_page_has_its_own_etag(client, app):
+    add_products(3, add_users(1))
+    etags = {client.get(url).headers['ETag'] for url in
+             ['/api/products/?limit=2', '/api/products/?limit=3', '/api/products/?limit=3&sort=oldest']}
+    assert len(etags) == 3
@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+
+import pytest
+
+from app.models import db, Review
+from conftest import add_products, add_users
+
+
+@pytest.fixture
+def catalog(app, monkeypatch):
+    # several batches per download
+    monkeypatch.setitem(app.config, 'EXPORT_BATCH_SIZE', 2)
+    users = add_users(2)
+    products = add_products(5, users)
+    db.session.add_all([
+        Review(user_id=users[i % 2].id, product_id=products[i].id, rating=5, title=f'Review {i}',
+               content='Great, "really"\nwould buy again')
+        for i in range(5)
+    ])
+    db.session.commit()
+    return [product.id for product in products]
+
+
+def ndjson_rows(response):
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def csv_rows(response):
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    return list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+
+
+@pytest.mark.parametrize('url', ['/api/products/export', '/api/reviews/export'])
+def test_ndjson_export_resumes_after_the_last_id(client, catalog, url):
+    everything = ndjson_rows(client.get(url))
+    ids = [row['id'] for row in everything]
+    assert ids == sorted(ids) and len(ids) == 5
+
+    # a download that broke off after the second row
+    first = ndjson_rows(client.get(url, query_string={'limit': 2}))
+    rest = ndjson_rows(client.get(url, query_string={'after_id': first[-1]['id']}))
+    assert first + rest == everything
+
+
+@pytest.mark.parametrize('url', ['/api/products/export', '/api/reviews/export'])
+def test_csv_export_resumes_after_the_last_id(client, catalog, url):
+    everything = csv_rows(client.get(url, query_string={'format': 'csv'}))
+    assert len(everything) == 5
+
+    first = csv_rows(client.get(url, query_string={'format': 'csv', 'limit': 3}))
+    rest = csv_rows(client.get(url, query_string={'format': 'csv', 'after_id': first[-1]['id']}))
+    # every resumed download starts with its own header row
+    assert first + rest == everything
+
+
+def test_exported_values(client, catalog):
+    product = ndjson_rows(client.get('/api/products/export', query_string={'limit': 1}))[0]
+    assert (product['id'], product['title'], product['price'], product['seller_username']) == \
+        (catalog[0], 'Product 0', 0.99, 'user0')
+
+    review = csv_rows(client.get('/api/reviews/export', query_string={'format': 'csv', 'limit': 1}))[0]
+    assert review['content'] == 'Great, "really"\nwould buy again'
+
+    assert ndjson_rows(client.get('/api/products/export', query_string={'after_id': catalog[-1]})) == []
+
+
+@pytest.mark.parametrize('args', [{'format': 'xml'}, {'after_id': -1}, {'after_id': 'x'}, {'limit': 0}])
+def test_rejects_bad_export_args(client, catalog, args):
+    response = client.get('/api/products/export', query_string=args)
+    assert response.status_code == 400
+    assert list(response.get_json()['errors']) == list(args)
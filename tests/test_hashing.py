@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from app.hashing import HashingBusy, HashingPool
+
+# slow enough (~1s) that a hash is still running while the test looks
+SLOW_METHOD = 'pbkdf2:sha256:2000000'
+
+
+def make_pool(**config):
+    app = Flask(__name__)
+    app.config.update({f'PASSWORD_HASH_{name.upper()}': value for name, value in config.items()})
+    return HashingPool(app)
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_burst_past_the_limit_is_rejected():
+    pool = make_pool(workers=1, queue_limit=1)
+    threads = [threading.Thread(target=pool.generate, args=('password', SLOW_METHOD, 16)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: pool.in_flight == 2)
+
+    with pytest.raises(HashingBusy):
+        pool.generate('password', SLOW_METHOD, 16)
+    assert pool.rejected == 1
+
+    for thread in threads:
+        thread.join()
+    assert pool.in_flight == 0
+    # and once the burst is over, hashing works again
+    assert pool.check(pool.generate('password', 'pbkdf2:sha256:1000', 16), 'password')
+
+
+def test_timed_out_hashes_keep_their_slots_until_they_finish():
+    pool = make_pool(workers=1, queue_limit=0, timeout=0.2)
+    # start the pool process first so the slow hash is running, not queued
+    pool.generate('password', 'pbkdf2:sha256:1000', 16)
+
+    with pytest.raises(HashingBusy):
+        pool.generate('password', SLOW_METHOD, 16)
+    # the caller gave up, but its hash still occupies the only slot
+    assert pool.in_flight == 1
+    with pytest.raises(HashingBusy):
+        pool.generate('password', 'pbkdf2:sha256:1000', 16)
+    assert pool.rejected == 2
+
+    wait_for(lambda: pool.in_flight == 0)
+
+
+def test_pool_processes_are_not_forked_from_a_threaded_process():
+    pool = make_pool(workers=1)
+    assert pool.check(pool.generate('password', 'pbkdf2:sha256:1000', 16), 'password')
+    assert pool._pool()._mp_context.get_start_method() in ('forkserver', 'spawn')
@@ -0,0 +1,24 @@
+import pytest
+
+
+@pytest.fixture
+def token(app):
+    app.config['METRICS_TOKEN'] = 'secret'
+    yield 'secret'
+    app.config['METRICS_TOKEN'] = None
+
+
+@pytest.mark.parametrize('url', ['/api/metrics', '/api/cache/stats'])
+def test_token_required_when_configured(client, token, url):
+    assert client.get(url).status_code == 401
+    assert client.get(url, headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get(url, headers={'Authorization': f'Bearer {token}'}).status_code == 200
+
+
+@pytest.mark.parametrize('url', ['/api/metrics', '/api/cache/stats'])
+def test_hidden_in_production_without_token(client, monkeypatch, url):
+    assert client.get(url).status_code == 200
+    monkeypatch.setenv('FLASK_ENV', 'production')
+    # the React fallback answers unknown paths, so check it's not the real payload
+    response = client.get(url)
+    assert b'# TYPE' not in response.get_data() and b'responses' not in response.get_data()
@@ -0,0 +1,124 @@
+from collections import Counter
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event, func
+
+from app.models import db, Product, Review
+from conftest import add_products, add_users, login
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = Counter()
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements[statement] += 1
+
+    @property
+    def total(self):
+        return sum(self.statements.values())
+
+
+def count_statements(client, url):
+    with StatementCounter(db.engine) as counter:
+        response = client.get(url)
+    assert response.status_code == 200
+    return response, counter.total
+
+
+@pytest.fixture
+def catalog(app):
+    sellers = add_users(10)
+    add_products(60, sellers)
+    return sellers
+
+
+def test_catalog_statement_count_does_not_grow_with_page_size(client, catalog):
+    small, small_count = count_statements(client, '/api/products/?limit=5')
+    large, large_count = count_statements(client, '/api/products/?limit=50')
+
+    assert len(small.json['products']) == 5
+    assert len(large.json['products']) == 50
+    assert {product['seller']['username'] for product in large.json['products']} == \
+        {seller.username for seller in catalog}
+    assert small_count == large_count
+
+
+def test_manage_statement_count_does_not_grow_with_product_count(client, app):
+    few_seller, many_seller = add_users(2)
+    add_products(5, [few_seller])
+    add_products(50, [many_seller])
+
+    login(client, few_seller.email)
+    few, few_count = count_statements(client, '/api/products/manage')
+    client.get('/api/auth/logout')
+    login(client, many_seller.email)
+    many, many_count = count_statements(client, '/api/products/manage')
+
+    assert len(few.json) == 5
+    assert len(many.json) == 50
+    assert few_count == many_count
+
+
+def rating_aggregates(product_id):
+    return tuple(db.session.execute(
+        db.select(Product.review_count, Product.rating_total, Product.average_rating)
+        .where(Product.id == product_id)
+    ).one())
+
+
+def review(rating):
+    return {'rating': rating, 'title': 'Review', 'content': 'Words about it.'}
+
+
+def test_review_writes_keep_rating_aggregates_current(client, app):
+    seller, first, second = add_users(3)
+    product_id = add_products(1, [seller])[0].id
+
+    login(client, first.email)
+    review_id = client.post(f'/api/products/{product_id}/reviews', json=review(4)).get_json()['id']
+    assert rating_aggregates(product_id) == (1, 4, Decimal('4.00'))
+
+    login(client, second.email)
+    assert client.post(f'/api/products/{product_id}/reviews', json=review(1)).status_code == 201
+    assert rating_aggregates(product_id) == (2, 5, Decimal('2.50'))
+
+    login(client, first.email)
+    assert client.put(f'/api/reviews/{review_id}', json=review(5)).status_code == 200
+    assert rating_aggregates(product_id) == (2, 6, Decimal('3.00'))
+
+    assert client.delete(f'/api/reviews/{review_id}').status_code == 204
+    assert rating_aggregates(product_id) == (1, 1, Decimal('1.00'))
+
+
+def test_rebuilt_aggregates_match_a_fresh_avg(app):
+    users = add_users(3)
+    products = add_products(4, users)
+    # written around the routes, so the aggregates are left behind
+    db.session.execute(db.insert(Review), [
+        {'user_id': users[n % 3].id, 'product_id': products[n % 3].id, 'rating': n % 5 + 1,
+         'title': 'Review', 'content': 'Words about it.'}
+        for n in range(20)
+    ])
+    Product.rebuild_rating_aggregates()
+    db.session.commit()
+
+    fresh = {
+        product_id: (count, total, round(Decimal(average), 2))
+        for product_id, count, total, average in db.session.execute(
+            db.select(Review.product_id, func.count(Review.id), func.sum(Review.rating), func.avg(Review.rating))
+            .group_by(Review.product_id)
+        )
+    }
+    assert len(fresh) == 3
+    for product in products:
+        assert rating_aggregates(product.id) == fresh.get(product.id, (0, 0, Decimal('0.00')))
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.cache import LocalCacheBackend, cache
+from app.models import db, Product, User
+from app.replicas import replica_router
+from conftest import add_products, add_users, login
+
+
+@pytest.fixture
+def replica(app, tmp_path):
+    """
+    A second SQLite file attached as replica_0, holding a copy of the
+    primary's users and products whose titles lag behind as 'Replica <id>'.
+    """
+    add_products(2, add_users(1))
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    db.metadata.create_all(engine)
+    with engine.begin() as replica_connection:
+        for table in (User.__table__, Product.__table__):
+            rows = db.session.execute(db.select(table)).mappings().all()
+            replica_connection.execute(table.insert(), [dict(row) for row in rows])
+        replica_connection.execute(
+            db.update(Product).values(title='Replica ' + db.cast(Product.id, db.String))
+        )
+
+    db.engines['replica_0'] = engine
+    replica_router.keys.append('replica_0')
+    replica_router.reads['replica_0'] = replica_router.failures['replica_0'] = 0
+    yield engine
+    replica_router.keys.remove('replica_0')
+    del db.engines['replica_0']
+    engine.dispose()
+
+
+def title(client):
+    return client.get('/api/products/1').get_json()['title']
+
+
+def catalog_titles(client):
+    return {product['title'] for product in client.get('/api/products/').get_json()['products']}
+
+
+def test_gets_read_the_replica(client, replica):
+    assert title(client) == 'Replica 1'
+    assert catalog_titles(client) == {'Replica 1', 'Replica 2'}
+    assert replica_router.reads['replica_0'] == 2
+
+
+def test_reads_after_a_write_go_to_the_primary_until_the_window_ends(client, replica):
+    login(client)
+    assert client.put('/api/products/1', json={'title': 'Edited'}).status_code == 200
+    assert title(client) == 'Edited'
+
+    with client.session_transaction() as session:
+        session['db_primary_until'] = int(time.time()) - 1
+    assert title(client) == 'Replica 1'
+
+
+def test_reads_after_a_write_skip_response_cache_entries(client, app, replica):
+    cache.backend = LocalCacheBackend()
+    try:
+        # another browser (its own app context, so its own g) fills the
+        # cache from the replica
+        with app.app_context():
+            assert catalog_titles(app.test_client()) == {'Replica 1', 'Replica 2'}
+
+        login(client)
+        assert client.put('/api/products/2', json={'title': 'Edited'}).status_code == 200
+        assert catalog_titles(client) == {'Product 0', 'Edited'}
+    finally:
+        cache.backend = None
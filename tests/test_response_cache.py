@@ -0,0 +1,146 @@
+import fnmatch
+import importlib
+import time
+
+import pytest
+
+from app.cache import LocalCacheBackend, RedisCacheBackend, cache
+from conftest import add_products, add_users, login
+
+# app.cache as an attribute is the ResponseCache instance, not the module
+cache_module = importlib.import_module('app.cache')
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class LocalRedis:
+    """
+    Stand-in for a redis.Redis client: the commands RedisCacheBackend
+    uses, with expiry and an evicted_keys counter for info('stats').
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.evicted_keys = 0
+
+    def get(self, key):
+        value, expires_at = self.values.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.values[key]
+            return None
+        return value
+
+    def set(self, key, value, ex=None):
+        self.values[key] = (value, time.monotonic() + ex if ex else None)
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+    def incr(self, key):
+        value = int(self.get(key) or 0) + 1
+        self.values[key] = (str(value).encode(), None)
+        return value
+
+    def scan_iter(self, match):
+        return [key for key in list(self.values) if fnmatch.fnmatch(key, match)]
+
+    def info(self, section):
+        return {'evicted_keys': self.evicted_keys}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def local_cache(app):
+    cache.backend = LocalCacheBackend()
+    yield cache.backend
+    cache.backend = None
+
+
+@pytest.fixture
+def redis_cache(app):
+    cache.backend = RedisCacheBackend(LocalRedis())
+    yield cache.backend
+    cache.backend = None
+
+
+def test_least_recently_used_entry_is_evicted():
+    backend = LocalCacheBackend(max_entries=2)
+    backend.set('a', b'1', 60)
+    backend.set('b', b'2', 60)
+    assert backend.get('a') == b'1'
+    backend.set('c', b'3', 60)
+
+    assert backend.get('b') is None
+    assert (backend.get('a'), backend.get('c')) == (b'1', b'3')
+    assert backend.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_their_ttl(clock):
+    backend = LocalCacheBackend()
+    backend.set('a', b'1', 60)
+    clock.now += 59
+    assert backend.get('a') == b'1'
+    clock.now += 1
+    assert backend.get('a') is None
+    assert backend.stats()['expirations'] == 1
+    assert backend.stats()['entries'] == 0
+
+
+def test_local_backend_counts_hits_and_misses():
+    backend = LocalCacheBackend()
+    backend.get('a')
+    backend.set('a', b'1', 60)
+    backend.get('a')
+    backend.get('a')
+    stats = backend.stats()
+    assert (stats['hits'], stats['misses']) == (2, 1)
+
+
+def test_redis_backend_serves_and_invalidates_cached_responses(client, redis_cache):
+    add_products(3, add_users(1))
+    first = client.get('/api/products/')
+    assert client.get('/api/products/').get_data() == first.get_data()
+    assert (redis_cache.hits, redis_cache.misses) == (1, 1)
+
+    cache.invalidate('catalog')
+    assert redis_cache.get_counter('version:catalog') == 1
+    client.get('/api/products/')
+    assert (redis_cache.hits, redis_cache.misses) == (1, 2)
+
+    redis_cache.client.evicted_keys = 4
+    assert cache.stats() == {'backend': 'redis', 'hits': 1, 'misses': 2, 'evictions': 4}
+    redis_cache.clear()
+    assert redis_cache.client.values == {}
+
+
+def test_product_writes_invalidate_the_catalog(client, local_cache):
+    add_users(1)
+    login(client)
+
+    def versions(id):
+        return local_cache.get_counter('version:catalog'), local_cache.get_counter(f'version:product:{id}')
+
+    created = client.post('/api/products/', json={'title': 'Lamp', 'description': 'A lamp', 'price': 10})
+    id = created.get_json()['id']
+    assert versions(id) == (1, 0)
+
+    client.get('/api/products/')
+    client.put(f'/api/products/{id}', json={'title': 'Desk lamp'})
+    assert versions(id) == (2, 1)
+    assert client.get('/api/products/').get_json()['products'][0]['title'] == 'Desk lamp'
+
+    client.delete(f'/api/products/{id}')
+    assert versions(id) == (3, 2)
+    assert client.get('/api/products/').get_json()['products'] == []
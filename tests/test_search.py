@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy import inspect
+
+from app.models import db, Product
+from app.search import index
+from conftest import add_users, login
+
+
+@pytest.fixture(autouse=True)
+def fresh_index(app):
+    # the index outlives each test's database
+    index.build([])
+    yield
+    index.build([])
+
+
+def search_titles(client, q, **args):
+    response = client.get('/api/products/search', query_string={'q': q, **args})
+    assert response.status_code == 200
+    return [product['title'] for product in response.get_json()['products']]
+
+
+def add_product(seller, title, description):
+    product = Product(seller_id=seller.id, title=title, description=description, price=1)
+    db.session.add(product)
+    db.session.commit()
+    return product
+
+
+def test_title_matches_rank_above_description_matches(client):
+    seller, = add_users(1)
+    add_product(seller, 'Reading chair', 'Oak frame, wool cushion')
+    add_product(seller, 'Floor lamp', 'Tall enough to light a reading chair')
+    add_product(seller, 'Bookshelf', 'Sits next to the lamp')
+    index.built = False
+
+    # equal scores would list the newest product first
+    assert search_titles(client, 'lamp') == ['Floor lamp', 'Bookshelf']
+    assert search_titles(client, 'reading chair') == ['Reading chair', 'Floor lamp']
+    assert search_titles(client, 'lamp', limit=1, offset=1) == ['Bookshelf']
+    assert search_titles(client, 'sofa') == []
+
+
+def test_index_follows_product_create_update_and_delete(client):
+    add_users(1)
+    login(client)
+    assert search_titles(client, 'lamp') == []
+
+    created = client.post('/api/products/', json={'title': 'Desk lamp', 'description': 'Brass', 'price': 10})
+    id = created.get_json()['id']
+    assert search_titles(client, 'lamp') == ['Desk lamp']
+
+    client.put(f'/api/products/{id}', json={'title': 'Reading light'})
+    assert search_titles(client, 'lamp') == []
+    assert search_titles(client, 'reading') == ['Reading light']
+
+    client.delete(f'/api/products/{id}')
+    assert search_titles(client, 'reading') == []
+
+
+def test_rolled_back_writes_stay_out_of_the_index(client):
+    seller, = add_users(1)
+    search_titles(client, 'lamp')
+    db.session.add(Product(seller_id=seller.id, title='Desk lamp', description='Brass', price=1))
+    db.session.flush()
+    db.session.rollback()
+    assert search_titles(client, 'lamp') == []
+
+
+def test_no_search_vector_index_on_sqlite(app):
+    assert 'ix_products_search_vector' not in {
+        index['name'] for index in inspect(db.engine).get_indexes('products')
+    }
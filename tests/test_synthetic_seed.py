@@ -0,0 +1,33 @@
+import pytest
+
+from app.models import db, Product, Review, User, Wishlist
+from app.seeds.synthetic import seed_synthetic
+
+
+def dump():
+    # the password hash has a random salt, so it is the one column left out
+    return {
+        model.__tablename__: [tuple(row) for row in db.session.execute(
+            db.select(*[column for column in model.__table__.columns if column.name != 'hashed_password'])
+            .order_by(*model.__table__.primary_key.columns)
+        )]
+        for model in (User, Product, Review, Wishlist)
+    }
+
+
+def test_same_seed_same_rows(app):
+    seed_synthetic(5, 20, 40, 30, seed=7)
+    first = dump()
+    db.drop_all(bind_key=None)
+    db.create_all(bind_key=None)
+    seed_synthetic(5, 20, 40, 30, seed=7)
+
+    assert dump() == first
+    assert len(first['wish_list']) == 30
+
+
+def test_every_pair_can_be_wishlisted(app):
+    seed_synthetic(3, 4, 0, 12)
+    assert Wishlist.query.count() == 12
+    with pytest.raises(ValueError):
+        seed_synthetic(3, 4, 0, 13)
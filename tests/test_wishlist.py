@@ -0,0 +1,102 @@
+import threading
+from collections import Counter
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.sql.dml import Insert
+
+from app.models import db, Product, User, Wishlist
+from conftest import add_products, add_users, login
+
+
+@pytest.fixture
+def wishlisted(app, client):
+    user, = add_users(1)
+    products = add_products(5, [user])
+    db.session.add_all([Wishlist(user_id=user.id, product_id=product.id) for product in products])
+    db.session.commit()
+    login(client, user.email)
+    return products
+
+
+def test_each_wishlist_representation_has_its_own_etag(client, wishlisted):
+    urls = ['/api/wishlist/', '/api/wishlist/?fields=ids', '/api/wishlist/?limit=2',
+            '/api/wishlist/?limit=2&cursor=2', '/api/wishlist/?fields=ids&limit=2']
+    etags = {url: client.get(url).headers['ETag'] for url in urls}
+    assert len(set(etags.values())) == len(urls)
+
+    for url in urls:
+        for other_url, etag in etags.items():
+            response = client.get(url, headers={'If-None-Match': etag})
+            assert response.status_code == (304 if other_url == url else 200)
+
+
+def test_removal_is_never_answered_from_if_modified_since(client, wishlisted):
+    first = client.get('/api/wishlist/')
+    assert 'Last-Modified' not in first.headers
+
+    assert client.delete(f'/api/wishlist/{wishlisted[0].id}').status_code == 200
+    since = client.get('/api/wishlist/', headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+    assert since.status_code == 200
+    assert len(since.get_json()) == len(wishlisted) - 1
+    assert client.get('/api/wishlist/', headers={'If-None-Match': first.headers['ETag']}).status_code == 200
+
+
+def test_adding_an_unknown_product_is_a_404(client, wishlisted):
+    response = client.post('/api/wishlist/99999')
+    assert response.status_code == 404
+    assert Wishlist.query.filter_by(product_id=99999).count() == 0
+
+
+def test_bulk_add_skips_products_deleted_mid_request(client, wishlisted):
+    seller = db.session.get(User, wishlisted[0].seller_id)
+    kept_id, deleted_id = [product.id for product in add_products(2, [seller])]
+
+    def delete_product_first(connection, clauseelement, *args):
+        # the product goes away after the existence check, before the insert
+        if isinstance(clauseelement, Insert) and clauseelement.table.name == 'wish_list':
+            connection.execute(db.delete(Product).where(Product.id == deleted_id))
+
+    event.listen(db.engine, 'before_execute', delete_product_first)
+    try:
+        response = client.post('/api/wishlist/bulk', json={'productIds': [wishlisted[0].id, kept_id, deleted_id]})
+    finally:
+        event.remove(db.engine, 'before_execute', delete_product_first)
+
+    assert response.status_code == 200
+    assert response.get_json() == {'added': 1}
+    assert Wishlist.query.filter_by(product_id=kept_id).count() == 1
+    assert Wishlist.query.filter_by(product_id=deleted_id).count() == 0
+
+
+def test_concurrent_adds_create_one_row(app, client):
+    user, = add_users(1)
+    product_id = add_products(1, [user])[0].id
+    user_id = user.id
+    login(client, user.email)
+    cookies = {cookie.name: cookie.value for cookie in client.cookie_jar}
+
+    statuses = Counter()
+    ids = set()
+    lock = threading.Lock()
+
+    def hammer():
+        browser = app.test_client()
+        for name, value in cookies.items():
+            browser.set_cookie('localhost', name, value)
+        for _ in range(10):
+            response = browser.post(f'/api/wishlist/{product_id}')
+            with lock:
+                statuses[response.status_code] += 1
+                if response.status_code < 300:
+                    ids.add(response.json['id'])
+
+    threads = [threading.Thread(target=hammer) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses == {201: 1, 200: 159}
+    assert len(ids) == 1
+    assert Wishlist.query.filter_by(user_id=user_id, product_id=product_id).count() == 1